@@ -1,116 +1,301 @@
 import os
+import time
+import queue
+import hashlib
+import threading
 import requests
-from bs4 import BeautifulSoup
+import parsers
 from urllib3.util.retry import Retry
-from requests.adapters import HTTPAdapter
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from rate_limiter import RateLimiter, RateLimitedAdapter
+from content_store import ContentStore
+from download_manifest import DownloadManifest, StalePartialDownload, hash_file
+from metadata_store import paper_hash_from_link
+from metrics import Metrics, profile, url_host
+from http_cache import HTTPCache, url_year
+from scrape_state import ScrapeState, paper_hash
 
 BASE_URL = "https://papers.nips.cc"
 OUTPUT_DIR = r"D:\scrapped-pdf"
 MAX_RETRIES = 3  
 TIMEOUT = 60  
+YEAR_THREADS = 4
 PROCESS_THREADS = 20 
 DOWNLOAD_THREADS = 20
+PAPER_QUEUE_SIZE = 500
+DOWNLOAD_QUEUE_SIZE = 200
+CHUNK_SIZE = 64 * 1024
+CACHE_FILE = ".http_cache.sqlite"
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+FROZEN_BEFORE_YEAR = 2024  # Proceedings older than this are never refetched
+PARSER_BACKEND = None  # None picks the fastest installed backend, see parsers.py
+FAST_INDEX = True  # Derive PDF links from the year index instead of fetching every abstract page
+VERIFY_DERIVED_PDF = False  # HEAD-check derived PDF links before queueing them
+RATE_LIMIT = 10.0  # Initial requests/s per host; adapts to how the host responds
+INITIAL_HOST_CONCURRENCY = 4
+INCREMENTAL = True  # Only process years whose index changed and papers not seen before
+METRICS_JSON = None  # e.g. "metrics.json": per-stage, per-host timings written at the end of the run
+METRICS_PROM = None  # e.g. "metrics.prom": the same in Prometheus text format
+METRICS_PORT = None  # Serve Prometheus metrics on this port while running
+PROFILE_OUTPUT = None  # e.g. "scrapper.pstats" to profile the run
+PROFILER = 'cprofile'  # or 'yappi', which also sees the worker threads
 
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
+manifest = DownloadManifest(OUTPUT_DIR)
+content_store = ContentStore(OUTPUT_DIR)
+scrape_state = ScrapeState(os.path.join(OUTPUT_DIR, ".scrape_state.json"))
 
 session = requests.Session()
-retry = Retry(total=MAX_RETRIES, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
-session.mount('https://', HTTPAdapter(max_retries=retry))
+# 429/503 are left to the rate limiter, which backs the whole host off and honours Retry-After.
+retry = Retry(total=MAX_RETRIES, backoff_factor=1, status_forcelist=[500, 502, 504],
+              respect_retry_after_header=False)
+rate_limiter = RateLimiter(rate=RATE_LIMIT, concurrency=INITIAL_HOST_CONCURRENCY,
+                           max_concurrency=max(PROCESS_THREADS, DOWNLOAD_THREADS))
+# One pooled connection per worker thread, so no thread ever finds the pool full and
+# opens a connection that is thrown away afterwards (requests defaults to 10).
+POOL_SIZE = YEAR_THREADS + PROCESS_THREADS + DOWNLOAD_THREADS
+adapter = RateLimitedAdapter(rate_limiter, max_retries=retry, pool_maxsize=POOL_SIZE)
+session.mount('https://', adapter)
+session.mount('http://', adapter)
+parser = parsers.get_parser(PARSER_BACKEND)
+STAGE_DONE = object()  # Sentinel that tells a stage worker to exit
+http_cache = HTTPCache(CACHE_FILE, max_bytes=CACHE_MAX_BYTES, frozen_before_year=FROZEN_BEFORE_YEAR)
+metrics = Metrics(enabled=bool(METRICS_JSON or METRICS_PROM or METRICS_PORT))
+if metrics.enabled:
+    session.hooks['response'].append(metrics.requests_hook)
 
-def fetch_page(url):
-    """Fetches and parses an HTML page, handling potential errors."""
+def fetch_html(url):
+    """Fetches a page's HTML through the cache, handling potential errors."""
     try:
-        response = session.get(url, timeout=TIMEOUT)
-        response.raise_for_status()
-        return BeautifulSoup(response.text, 'html.parser')
+        with metrics.timer('fetch', url_host(url)):
+            return http_cache.get_text(session, url, timeout=TIMEOUT)
     except requests.RequestException as e:
         print(f"Failed to fetch {url}: {e}")
         return None
 
 def get_yearly_proceedings_links():
 
-    soup = fetch_page(BASE_URL)
-    if not soup:
+    html = fetch_html(BASE_URL)
+    if html is None:
         return []
-    return [BASE_URL + a['href'] for a in soup.select("a[href^='/paper_files/paper/']")]
+    return [BASE_URL + href for href in parser.proceedings_links(html)]
 
 def get_paper_links(year_url):
 
-    soup = fetch_page(year_url)
-    if not soup:
+    print(f"Fetching paper links for year: {year_url}")
+    html = fetch_html(year_url)
+    if html is None:
         return []
-    paper_list = soup.find('ul', class_='paper-list')
-    return [BASE_URL + a['href'] for a in paper_list.find_all('a')]
+    year = url_year(year_url) or year_url
+    if INCREMENTAL and not scrape_state.page_changed(year, html):
+        print(f"Index unchanged since last run, skipping: {year_url}")
+        return []
+    with metrics.timer('parse', url_host(year_url)):
+        entries = parser.year_index(html)
+    hashes = [paper_hash(entry['href']) for entry in entries]
+    new_hashes = set(scrape_state.new_paper_hashes(year, hashes)) if INCREMENTAL else set(hashes)
+    scrape_state.update(year, html, hashes)
+    # Papers only count as done once downloaded, see main().
+    return [dict(entry, year=year, hash=h) for entry, h in zip(entries, hashes) if h in new_hashes]
 
 def download_pdf(pdf_url, filename):
 
+    paper_hash = paper_hash_from_link(pdf_url)
+    name = content_store.name_for(paper_hash, f"{filename}.pdf")
+    final_path = os.path.join(OUTPUT_DIR, name)
+    tmp_path = final_path + ".part"
+    host = url_host(pdf_url)
+    started = time.perf_counter()
+    sha256 = content_store.lookup(paper_hash)
+    if sha256 is not None:
+        content_store.link(sha256, final_path, paper_hash=paper_hash)
+        print(f"Already downloaded: {name}")
+        return True
+    if manifest.is_complete(pdf_url, final_path):
+        # Downloaded before the content store existed.
+        content_store.adopt(final_path, paper_hash, filename)
+        print(f"Already downloaded: {name}")
+        return True
     try:
-        with session.get(pdf_url, stream=True, timeout=TIMEOUT) as response:
+        headers = manifest.resume_headers(pdf_url, tmp_path)
+        with session.get(pdf_url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+            if response.status_code == 416:
+                # The partial file no longer lines up with the server copy; start over
+                # once this response has been closed.
+                os.remove(tmp_path)
+                manifest.progress(pdf_url, tmp_path)
+                raise StalePartialDownload(pdf_url)
             response.raise_for_status()
-            with open(os.path.join(OUTPUT_DIR, f"{filename}.pdf"), 'wb') as file:
-                for chunk in response.iter_content(8192):
-                    file.write(chunk)
-            print(f"Saved PDF: {filename}.pdf")
-    except requests.RequestException as e:
+            resumed = response.status_code == 206
+            hasher = hash_file(tmp_path) if resumed else hashlib.sha256()
+            manifest.start(pdf_url, final_path, response.status_code, response.headers)
+            transfer_started = time.perf_counter()
+            write_time = 0.0
+            try:
+                with open(tmp_path, 'ab' if resumed else 'wb') as file:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        write_started = time.perf_counter()
+                        file.write(chunk)
+                        write_time += time.perf_counter() - write_started
+                        hasher.update(chunk)
+            finally:
+                # Leave the .part file behind so an interrupted run resumes from here.
+                entry = manifest.progress(pdf_url, tmp_path)
+                metrics.observe('transfer', host, time.perf_counter() - transfer_started)
+                metrics.observe('write', host, write_time)
+            if entry['expected_size'] is not None and entry['bytes_written'] != entry['expected_size']:
+                print(f"Incomplete download of {filename}.pdf "
+                      f"({entry['bytes_written']}/{entry['expected_size']} bytes), will resume next run")
+                return False
+            # Only a complete body is ever visible under the final name.
+            os.replace(tmp_path, final_path)
+            manifest.finish(pdf_url, entry['bytes_written'], hasher.hexdigest())
+            content_store.put(final_path, name, paper_hash, filename, sha256=hasher.hexdigest())
+            metrics.observe('download', host, time.perf_counter() - started)
+            metrics.inc('pdf_bytes', host, entry['bytes_written'])
+            print(f"{'Resumed' if resumed else 'Saved'} PDF: {name}")
+            return True
+    except StalePartialDownload:
+        return download_pdf(pdf_url, filename)
+    except (requests.RequestException, OSError) as e:
         print(f"Failed to download {pdf_url}: {e}")
+        return False
 
-def process_paper(paper_url, download_executor):
-
+def resolve_from_abstract(paper_url):
+    """Returns the (pdf_url, filename) download job read from a paper's abstract page."""
     try:
         print(f"Processing paper: {paper_url}")
-        paper_page = session.get(paper_url, timeout=TIMEOUT)
-        paper_page.raise_for_status()
+        with metrics.timer('fetch', url_host(paper_url)):
+            html = http_cache.get_text(session, paper_url, timeout=TIMEOUT)
+        with metrics.timer('parse', url_host(paper_url)):
+            page = parser.paper_page(html)
 
-        soup = BeautifulSoup(paper_page.text, "html.parser")
-
-
-        title_tag = soup.select_one("h4")
-        paper_title = title_tag.text.strip() if title_tag else "Untitled"
+        paper_title = page['title'] or "Untitled"
         sanitized_title = sanitize_filename(paper_title)
 
-        pdf_link = soup.select_one("a[href$='.pdf']")  
-        if pdf_link:
-            pdf_url = BASE_URL + pdf_link["href"]
+        if page['pdf_href']:
+            pdf_url = BASE_URL + page['pdf_href']
             print(f"Found PDF link: {pdf_url}")
-
-            download_executor.submit(download_pdf, pdf_url, sanitized_title)
-        else:
-            print(f"No PDF found for {paper_url}")
+            return [(pdf_url, sanitized_title, None)]
+        print(f"No PDF found for {paper_url}")
 
     except requests.RequestException as e:
         print(f"Failed to process {paper_url}: {e}")
+    return []
+
+def pdf_exists(pdf_url):
+
+    try:
+        return session.head(pdf_url, timeout=TIMEOUT, allow_redirects=True).status_code != 404
+    except requests.RequestException:
+        return True  # Let the download itself surface the error
+
+def process_paper(entry):
+    """Turns a year index entry into a (pdf_url, filename, fallback_paper_url, (year, hash)) download job.
+
+    In FAST_INDEX mode the PDF URL is derived from the abstract link on the index
+    page, so no abstract page is fetched; the abstract URL travels with the job
+    so the download stage can fall back to it if the derived URL is wrong.
+    """
+    paper_url = BASE_URL + entry['href']
+    key = (entry['year'], entry['hash'])
+    if FAST_INDEX:
+        pdf_href = parsers.derive_pdf_href(entry['href'])
+        if pdf_href and (not VERIFY_DERIVED_PDF or pdf_exists(BASE_URL + pdf_href)):
+            return [(BASE_URL + pdf_href, sanitize_filename(entry['title'] or "Untitled"), paper_url, key)]
+    return [job + (key,) for job in resolve_from_abstract(paper_url)]
 
 def sanitize_filename(filename):
 
     return ''.join(c if c.isalnum() or c in (' ', '-') else '_' for c in filename)
 
-def main():
+def stage_worker(func, inbox, outbox):
+    """Feeds items from inbox through func, passing each result on to outbox."""
+    while True:
+        item = inbox.get()
+        if item is STAGE_DONE:
+            return
+        try:
+            with metrics.timer(func.__name__):
+                results = func(item) or ()
+            for result in results:
+                outbox.put(result)
+        except Exception as e:
+            print(f"Error in {func.__name__} for {item}: {e}")
 
-    yearly_links = get_yearly_proceedings_links()
-    print(f"Found {len(yearly_links)} yearly proceedings.")
+def start_stage(func, inbox, outbox, workers):
 
+    threads = [threading.Thread(target=stage_worker, args=(func, inbox, outbox), daemon=True)
+               for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    return threads
 
-    paper_links = []
-    for year_link in yearly_links:
-        print(f"Fetching paper links for year: {year_link}")
-        paper_links.extend(get_paper_links(year_link))
+def finish_stage(threads, inbox):
+    """Waits for a stage to drain its inbox; call once the upstream stage has finished."""
+    for _ in threads:
+        inbox.put(STAGE_DONE)
+    for thread in threads:
+        thread.join()
 
-    print(f"Found {len(paper_links)} total papers.")
+def main():
 
+    started = time.perf_counter()
+    first_pdf = []
+    done_papers = []  # (year, paper hash) of every PDF now on disk
 
-    with ThreadPoolExecutor(max_workers =DOWNLOAD_THREADS) as download_executor:
+    def download_job(job):
+        pdf_url, filename, fallback_url, key = job
+        saved = download_pdf(pdf_url, filename)
+        if not saved and fallback_url:
+            print(f"Derived PDF link failed, falling back to abstract page: {fallback_url}")
+            for pdf_url, filename, _ in resolve_from_abstract(fallback_url):
+                saved = download_pdf(pdf_url, filename)
+        if saved:
+            done_papers.append(key)
+        if not first_pdf:
+            first_pdf.append(time.perf_counter() - started)
 
-        with ThreadPoolExecutor(max_workers=PROCESS_THREADS) as process_executor:
-            process_futures = [process_executor.submit(process_paper, link, download_executor) for link in paper_links]
-            for future in as_completed(process_futures):
-                try:
-                    future.result()
-                except Exception as e:
-                    print(f"Error processing paper link: {e}")
+    yearly_links = get_yearly_proceedings_links()
+    print(f"Found {len(yearly_links)} yearly proceedings.")
+
+    # year index -> paper URLs -> (PDF URL, filename) -> download, each stage with its own
+    # workers. The bounded queues provide backpressure, so paper pages and downloads start
+    # as soon as the first year index is parsed instead of after every year is listed.
+    year_queue = queue.Queue()
+    paper_queue = queue.Queue(maxsize=PAPER_QUEUE_SIZE)
+    download_queue = queue.Queue(maxsize=DOWNLOAD_QUEUE_SIZE)
+
+    year_threads = start_stage(get_paper_links, year_queue, paper_queue, YEAR_THREADS)
+    process_threads = start_stage(process_paper, paper_queue, download_queue, PROCESS_THREADS)
+    download_threads = start_stage(download_job, download_queue, None, DOWNLOAD_THREADS)
+
+    for year_link in yearly_links:
+        year_queue.put(year_link)
+    finish_stage(year_threads, year_queue)
+    finish_stage(process_threads, paper_queue)
+    finish_stage(download_threads, download_queue)
 
-    print("All downloads initiated.")
+    # Only papers whose PDF is on disk are recorded as done; a year with a failed
+    # download stays pending, so the next run retries (and resumes) just those.
+    done_by_year = {}
+    for year, paper_hash in done_papers:
+        done_by_year.setdefault(year, []).append(paper_hash)
+    for year, hashes in done_by_year.items():
+        scrape_state.mark_done(year, hashes)
+    scrape_state.save()
+    print(f"All downloads finished in {time.perf_counter() - started:.1f}s"
+          + (f" (first PDF after {first_pdf[0]:.1f}s)." if first_pdf else "."))
+    print(f"HTTP cache: {http_cache.stats()}")
+    print(f"Rate limiter: {rate_limiter.stats()}")
+    print(f"Connections: {adapter.connection_stats()}")
+    if METRICS_JSON:
+        metrics.write_json(METRICS_JSON)
+    if METRICS_PROM:
+        metrics.write_prometheus(METRICS_PROM)
 
 if __name__ == "__main__":
-    main()
+    if METRICS_PORT:
+        metrics.serve(METRICS_PORT)
+    with profile(PROFILE_OUTPUT, PROFILER):
+        main()
@@ -1,24 +1,14 @@
 import sys
 sys.path.append(r"E:\SEMESTER\Python scrapper\Packages")
 import threading
-import ssl
 from pathlib import Path
-import aiofiles
-from typing import List, Dict
 import time
-from bs4 import BeautifulSoup
-import random
 import os
-import csv
-import asyncio
-import aiohttp
 from tkinter import ttk, scrolledtext, messagebox, filedialog
 import tkinter as tk
-import subprocess
-import itertools
-from PIL import Image, ImageTk # Import Pillow for icons
-import datetime
-import concurrent.futures
+from neurips_engine import ScraperEngine
+from paper_table import PaperTable
+from event_bus import EventBus
 
 class NeurIPSScraper(tk.Tk):
 
@@ -33,21 +23,28 @@ class NeurIPSScraper(tk.Tk):
     ENTRY_FONT = ('Segoe UI', 11)
     TREEVIEW_FONT = ('Segoe UI', 10)
     LOG_FONT = ('Consolas', 10) # Monospace font for logs
-
-    CSV_OUTPUT_FILE = 'pdf_metadata_output.csv'
+    UI_TICK_MS = 100           # How often engine events are applied to the widgets
+    LOG_MAX_LINES = 2000       # Older log lines are dropped from the log area
 
     def __init__(self):
         super().__init__()
         self.title("NeurIPS Paper Scraper")
         self.configure(bg=self.BACKGROUND_COLOR)
-        self.state('zoomed')
+        try:
+            self.state('zoomed')  # Windows and macOS
+        except tk.TclError:
+            self.attributes('-zoomed', True)  # X11
         self.metadata_list = []
+        # All scraping and downloading happens in the engine; the window only renders its events.
+        self.events = EventBus(log_limit=self.LOG_MAX_LINES)
+        self.engine = ScraperEngine(on_event=self.events.publish)
         self.create_styles()
         self.initialize_gui()
+        self.drain_events()
 
     def create_styles(self):
         style = ttk.Style()
-        style.theme_use('vista')
+        style.theme_use('vista' if 'vista' in style.theme_names() else 'clam')
 
         style.configure('TFrame', background=self.BACKGROUND_COLOR)
         style.configure('TLabelFrame', background=self.BACKGROUND_COLOR,
@@ -131,6 +128,10 @@ class NeurIPSScraper(tk.Tk):
         browse_button.grid(row=0, column=2, padx=5, sticky=tk.E)
         dir_frame.columnconfigure(1, weight=1)
 
+        self.incremental_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(options_frame, text="Incremental (only new years and papers)",
+                        variable=self.incremental_var, style='TCheckbutton').pack(fill=tk.X, pady=5)
+
 
         buttons_frame = ttk.Frame(sidebar_frame, padding=10)
         buttons_frame.grid(row=2, column=0, sticky='ew', pady=(0, 10), padx=10)
@@ -145,27 +146,27 @@ class NeurIPSScraper(tk.Tk):
         content_frame = ttk.Frame(paned_window, padding=10)
         paned_window.add(content_frame, weight=3)
         content_frame.columnconfigure(0, weight=1)
-        content_frame.rowconfigure(0, weight=1)
-
-        columns = ("Title", "Authors", "Year", "PDF Link")
-        self.tree = ttk.Treeview(content_frame, columns=columns, show='headings', style='Treeview')
-        for col in columns:
-            self.tree.heading(col, text=col)
-            if col == "Title":
-                self.tree.column(col, width=400)
-            elif col == "Authors":
-                self.tree.column(col, width=300)
-            elif col == "Year":
-                self.tree.column(col, width=80, anchor='center')
-            else:
-                self.tree.column(col, width=250)
-
-        vsb = ttk.Scrollbar(content_frame, orient="vertical", command=self.tree.yview, style='Vertical.TScrollbar')
-        hsb = ttk.Scrollbar(content_frame, orient="horizontal", command=self.tree.xview, style='Horizontal.TScrollbar')
-        self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-        self.tree.grid(row=0, column=0, sticky='nsew')
-        vsb.grid(row=0, column=1, sticky='ns')
-        hsb.grid(row=1, column=0, sticky='ew')
+        content_frame.rowconfigure(1, weight=1)
+
+        filter_frame = ttk.Frame(content_frame)
+        filter_frame.grid(row=0, column=0, sticky='ew', pady=(0, 5))
+        ttk.Label(filter_frame, text="Filter:", style='TLabel').pack(side=tk.LEFT, padx=5)
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add('write', lambda *args: self.schedule_filter())
+        ttk.Entry(filter_frame, textvariable=self.filter_var, font=self.ENTRY_FONT).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        ttk.Label(filter_frame, text="Year:", style='TLabel').pack(side=tk.LEFT, padx=5)
+        self.filter_year = ttk.Combobox(filter_frame, values=["All"], width=5, state='readonly', font=self.ENTRY_FONT)
+        self.filter_year.set("All")
+        self.filter_year.bind('<<ComboboxSelected>>', lambda event: self.apply_filter())
+        self.filter_year.pack(side=tk.LEFT, padx=5)
+        self.shown_label = ttk.Label(filter_frame, text="0 papers", style='TLabel')
+        self.shown_label.pack(side=tk.LEFT, padx=5)
+        self.filter_job = None
+
+        # Only the visible rows exist as Treeview items; see paper_table.py.
+        self.table = PaperTable(content_frame)
+        self.table.grid(row=1, column=0, sticky='nsew')
+        self.table.bind('<<ViewChanged>>', self.on_view_changed)
 
 
         footer_frame = ttk.Frame(self, padding=20)
@@ -201,195 +202,110 @@ class NeurIPSScraper(tk.Tk):
             self.download_dir.delete(0, tk.END)
             self.download_dir.insert(0, directory)
 
-    def log(self, message: str):
-        self.log_area.insert(tk.END, f"{message}\n")
+    def log(self, *messages: str):
+        self.log_area.insert(tk.END, ''.join(f"{message}\n" for message in messages))
+        # Keep only the newest LOG_MAX_LINES lines so long runs don't grow the widget without bound.
+        excess = int(self.log_area.index('end-1c').split('.')[0]) - 1 - self.LOG_MAX_LINES
+        if excess > 0:
+            self.log_area.delete('1.0', f'{excess + 1}.0')
         self.log_area.see(tk.END)
 
-    async def download_pdf(self, session: aiohttp.ClientSession, pdf_url: str, destination_path: str, paper_title: str, paper_year: str):
-        user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0",
-            "Mozilla/5.0 (X11; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 14.5; rv:125.0) Gecko/20100101 Firefox/125.0",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15",
-        ]
-        headers = {'User-Agent': random.choice(user_agents)}
-
-        try:
-            async with session.get(pdf_url, headers=headers, timeout=60) as response: # Added timeout to session.get
-                if response.status == 200:
-                    async with aiofiles.open(destination_path, 'wb') as f:
-                        await f.write(await response.read())
-                    return True
-                else:
-                    self.log(f"Failed to download {pdf_url}: HTTP {response.status}")
-                    return False
-        except asyncio.TimeoutError:
-            self.log(f"Download timed out: {pdf_url}")
-            return False
-        except Exception as e:
-            self.log(f"Error downloading {pdf_url}: {str(e)}")
-            return False
-
-    async def scrape_year(self, session: aiohttp.ClientSession, year: int) -> List[Dict]:
-        if year < 2019:
-            base_url = f"https://papers.nips.cc/paper/{year}"
-            pdf_base = f"https://papers.nips.cc/paper_files/paper/{year}/file"
-        else:
-            base_url = f"https://proceedings.neurips.cc/paper/{year}"
-            pdf_base = f"https://proceedings.neurips.cc/paper/{year}/file"
-
-        user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0",
-            "Mozilla/5.0 (X11; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 14.5; rv:125.0) Gecko/20100101 Firefox/125.0",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15",
-        ]
-        headers = {'User-Agent': random.choice(user_agents)}
-        papers = []
-        try:
-            async with session.get(base_url, headers=headers, timeout=60) as response: # Added timeout to session.get
-                if response.status != 200:
-                    self.log(f"Failed to fetch year {year}: HTTP {response.status}")
-                    return papers
-
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                paper_links = soup.select("a[title='paper title']")
-
-                for paper_link in paper_links:
-                    try:
-                        title = paper_link.text.strip()
-                        authors_tag = paper_link.find_next('i')
-                        authors = authors_tag.text.strip() if authors_tag else ""
-                        abstract_url = paper_link.get('href', '')
-                        if 'Abstract' in abstract_url:
-                            paper_hash = abstract_url.split('/')[-1].replace('-Abstract.html', '')
-                            pdf_link = f"{pdf_base}/{paper_hash}-Paper.pdf"
-                            papers.append({
-                                'title': title,
-                                'authors': authors,
-                                'year': str(year),
-                                'pdf_link': pdf_link,
-                            })
-                    except Exception as e:
-                        self.log(f"Error processing paper: {str(e)}")
-                self.log(f"Year {year}: {len(papers)} papers saved in metadata.")
-        except asyncio.TimeoutError:
-            self.log(f"Scraping year {year} timed out.")
-        except Exception as e:
-            self.log(f"Error scraping year {year}: {str(e)}")
-        return papers
-
-    async def scrape_metadata_async(self):
-        start_year = int(self.start_year.get())
-        end_year = int(self.end_year.get())
-        years_to_scrape = range(start_year, end_year + 1)
-
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        connector = aiohttp.TCPConnector(ssl=ssl_context)
-
-        async with aiohttp.ClientSession(connector=connector, timeout=None) as session: # Removed default timeout from session
-            tasks = [self.scrape_year(session, year) for year in years_to_scrape] # Run tasks concurrently with gather
-            results = await asyncio.gather(*tasks)
-            all_papers = list(itertools.chain.from_iterable(results)) # Flatten list of lists
-
-        csv_path = Path(NeurIPSScraper.CSV_OUTPUT_FILE)
-        if not csv_path.exists():
-            with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=['title', 'authors', 'year', 'pdf_link'])
-                writer.writeheader()
-                writer.writerows(all_papers)
-        return all_papers
-
-
-    async def download_pdfs_async(self):
-        download_dir = Path(self.download_dir.get())
-        download_dir.mkdir(exist_ok=True)
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        connector = aiohttp.TCPConnector(ssl=ssl_context)
-        async with aiohttp.ClientSession(connector=connector) as session:
-            total = len(self.metadata_list)
-            self.update_stats(total_papers=total, downloaded=0, failed_download=0, skipped=0)
-            skipped_count = 0
-            failed_count = 0
-            downloaded_count = 0
-
-            for i, paper in enumerate(self.metadata_list, 1):
-                title = ''.join(c if c.isalnum() else '_' for c in paper['title'])
-                path = download_dir / f"{title}_{paper['year']}.pdf"
-
-                if path.exists():
-                    self.log(f"Skipping existing: {title} ({paper['year']})")
-                    skipped_count += 1
-                    self.update_stats(skipped=skipped_count)
-                else:
-                    self.log(f"Downloading: {title} ({paper['year']})")
-                    success = await self.download_pdf(session, paper['pdf_link'], str(path), paper['title'], paper['year'])
-                    if success:
-                        downloaded_count += 1
-                        self.update_stats(downloaded=downloaded_count)
-                    else:
-                        failed_count += 1
-                        self.update_stats(failed_download=failed_count)
-                progress = (i / total) * 100
-                self.progress_var.set(progress)
-
-            self.after(0, lambda: self.update_stats(total_papers=total, downloaded=downloaded_count, failed_download=failed_count, skipped=skipped_count))
+    def call_in_ui(self, func, *args):
+        """Runs func(*args) on the Tk thread after the events published before it."""
+        self.events.publish('call', (func, args))
+
+    def drain_events(self):
+        # Worker threads only publish; this is the one place their events reach the widgets.
+        for kind, data in self.events.drain():
+            if kind == 'log':
+                self.log(*data)
+            elif kind == 'stats':
+                self.update_stats(**data)
+            elif kind == 'progress':
+                self.progress_var.set(data['percent'])
+            elif kind == 'call':
+                func, args = data
+                func(*args)
+        self.after(self.UI_TICK_MS, self.drain_events)
+
+    def show_papers(self, papers):
+        self.table.add(papers)
+
+    def schedule_filter(self):
+        # Debounced so typing a word filters once rather than per keystroke.
+        if self.filter_job is not None:
+            self.after_cancel(self.filter_job)
+        self.filter_job = self.after(150, self.apply_filter)
+
+    def apply_filter(self):
+        self.filter_job = None
+        year = self.filter_year.get()
+        self.table.set_filter(self.filter_var.get(), None if year == "All" else year)
+
+    def on_view_changed(self, event):
+        store = self.table.store
+        self.shown_label.config(text=f"{len(store.view)} of {len(store)} papers")
+        self.filter_year.config(values=["All"] + store.years())
 
     def scrape_metadata(self):
         self.scrape_button.config(state=tk.DISABLED)
-        self.tree.delete(*self.tree.get_children())
+        self.table.clear()
         self.progress_var.set(0)
         self.metadata_list = []
         self.update_stats(total_papers=0)
+        start_year, end_year = int(self.start_year.get()), int(self.end_year.get())
+        self.engine.incremental = self.incremental_var.get()
 
         def run_scrape():
             start_time = time.time()
-            papers = asyncio.run(self.scrape_metadata_async())
+            new_papers = self.engine.run(self.engine.scrape_range(start_year, end_year))
+            papers = self.engine.load_metadata(start_year, end_year)
             elapsed_time = time.time() - start_time
-            self.after(0, self.finish_scrape, papers, elapsed_time)
+            self.call_in_ui(self.finish_scrape, papers, len(new_papers), elapsed_time)
         threading.Thread(target=run_scrape, daemon=True).start()
 
-    def finish_scrape(self, papers, elapsed_time):
+    def finish_scrape(self, papers, new_papers_count, elapsed_time):
+        # An incremental scrape only returns new papers; the view shows every stored one in the range.
         self.metadata_list = papers
         total_papers_count = len(papers)
-        for paper in papers:
-            self.tree.insert('', tk.END, values=(paper['title'], paper['authors'], paper['year'], paper['pdf_link']))
+        self.show_papers(papers)
         self.update_stats(total_papers=total_papers_count)
         self.scrape_button.config(state=tk.NORMAL)
         messagebox.showinfo("Scraping Complete",
-                            f"Scraped {total_papers_count} papers\nTotal time: {elapsed_time:.2f} seconds")
+                            f"Scraped {new_papers_count} new papers, {total_papers_count} stored for "
+                            f"{self.start_year.get()}-{self.end_year.get()}\nTotal time: {elapsed_time:.2f} seconds")
 
     def download_pdfs(self):
         self.download_button.config(state=tk.DISABLED)
         self.progress_var.set(0)
+        self.engine.download_dir = Path(self.download_dir.get())
+        self.engine.incremental = self.incremental_var.get()
+        start_year, end_year = int(self.start_year.get()), int(self.end_year.get())
+        shown = self.metadata_list
+
         def run_download():
-            if not self.metadata_list:
-                csv_path = Path(NeurIPSScraper.CSV_OUTPUT_FILE)
-                if csv_path.exists():
-                    self.log("Loading metadata from existing CSV...")
-                    with open(csv_path, 'r', newline='', encoding='utf-8') as f:
-                        reader = csv.DictReader(f)
-                        papers = list(reader)
-                    self.metadata_list = papers
-                    for paper in papers:
-                        self.tree.insert('', tk.END, values=(paper['title'], paper['authors'], paper['year'], paper['pdf_link']))
-                else:
-                    self.log("No metadata found. Scraping metadata now...")
-                    start_time = time.time()
-                    papers = asyncio.run(self.scrape_metadata_async())
-                    elapsed_time = time.time() - start_time
-                    self.after(0, self.finish_scrape, papers, elapsed_time)
-            asyncio.run(self.download_pdfs_async())
-            self.after(0, self.finish_download)
+            # Every stored paper in the range, not just what the last incremental scrape
+            # returned; the engine skips PDFs already in the content store without a request.
+            papers = self.engine.load_metadata(start_year, end_year)
+            if papers:
+                if not shown:
+                    self.engine.log("Loaded metadata from the metadata store.")
+                    self.call_in_ui(self.finish_load, papers)
+            else:
+                self.engine.log("No metadata found. Scraping metadata now...")
+                start_time = time.time()
+                new_papers = self.engine.run(self.engine.scrape_range(start_year, end_year))
+                papers = self.engine.load_metadata(start_year, end_year)
+                elapsed_time = time.time() - start_time
+                self.call_in_ui(self.finish_scrape, papers, len(new_papers), elapsed_time)
+            self.engine.run(self.engine.download_all(papers))
+            self.call_in_ui(self.finish_download)
         threading.Thread(target=run_download, daemon=True).start()
 
+    def finish_load(self, papers):
+        self.metadata_list = papers
+        self.show_papers(papers)
+
     def finish_download(self):
         self.download_button.config(state=tk.NORMAL)
         messagebox.showinfo("Download Complete", "PDF Download Complete")
@@ -405,5 +321,8 @@ class NeurIPSScraper(tk.Tk):
         if skipped is not None:
             self.stats_labels['skipped'].config(text=str(skipped))
 
-app = NeurIPSScraper()
-app.mainloop()
+if __name__ == "__main__":
+    # Guarded so parser worker processes can import this module on spawn platforms.
+    app = NeurIPSScraper()
+    app.mainloop()
+    app.engine.close()
@@ -0,0 +1,39 @@
+"""Helpers shared by the benchmark scripts.
+
+Importing this module puts the repository root on sys.path, so a script run
+as ``python benchmarks/bench_x.py`` can import the modules it measures.
+"""
+import os
+import sys
+import time
+import socket
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def timed(label, func):
+    """Runs func once, prints how long it took under label and returns its result."""
+    start = time.perf_counter()
+    result = func()
+    print(f"  {label:<36} {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return result
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_serving(url, timeout=10.0):
+    """Waits for the mock server at url to answer /stats."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(url + '/stats', timeout=1):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
@@ -0,0 +1,64 @@
+"""Deduplicates a directory of PDFs and times "already have it" checks.
+
+    python benchmarks/bench_content_store.py [files]
+
+Writes synthetic PDFs where every paper also exists as a mirror copy under a
+second name (the Scrapper.py and engine naming schemes), then times the first
+dedupe pass, a repeat pass, and looking papers up by hash against the old
+check of stat-ing a guessed file name and comparing its size. Both are a
+few microseconds per paper; only the lookup tells same-title papers apart.
+"""
+import os
+import sys
+import random
+import tempfile
+
+from bench_common import timed
+from content_store import ContentStore
+
+FILES = 2000
+PDF_SIZE = 256 * 1024
+
+
+def disk_usage(directory):
+    blocks = {}
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            st = os.lstat(os.path.join(root, filename))
+            blocks[(st.st_dev, st.st_ino)] = st.st_size
+    return sum(blocks.values())
+
+
+def main(files):
+    directory = tempfile.mkdtemp()
+    rng = random.Random(0)
+    papers = []
+    for i in range(files // 2):
+        body = b'%PDF-1.4 ' + rng.randbytes(PDF_SIZE)
+        for name in (f"Paper_title_{i}_2023.pdf", f"Paper title {i}.pdf"):
+            with open(os.path.join(directory, name), 'wb') as f:
+                f.write(body)
+        papers.append((f"{i:032x}", f"Paper_title_{i}_2023.pdf", len(body)))
+    print(f"{files} files, {disk_usage(directory) / 2**20:.0f} MiB before")
+
+    store = ContentStore(directory)
+    stats = timed("dedupe", store.dedupe)
+    print(f"  {stats}")
+    timed("dedupe again", store.dedupe)
+    print(f"  {disk_usage(directory) / 2**20:.0f} MiB after")
+
+    for paper_hash, name, _ in papers:
+        store.adopt(os.path.join(directory, name), paper_hash)
+
+    def guess_names():
+        return sum(os.path.exists(path) and os.path.getsize(path) == size
+                   for path, size in ((os.path.join(directory, name), size) for _, name, size in papers))
+    found = timed(f"guessed-name checks ({len(papers)})", guess_names)
+    assert found == len(papers)
+    found = timed(f"lookup by paper hash ({len(papers)})",
+                  lambda: sum(store.lookup(paper_hash) is not None for paper_hash, _, _ in papers))
+    assert found == len(papers)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else FILES)
@@ -0,0 +1,121 @@
+"""Throughput of a distributed crawl as workers are added, against the mock server.
+
+    python benchmarks/bench_distributed.py [--workers 1 2 4] [--papers 200] [--kill-one]
+
+For each worker count, a coordinator (this process) and that many worker
+processes share a SQLite work queue in a fresh temporary directory, and each
+worker downloads into its own directory with a small per-host connection
+limit, standing in for one node's bandwidth. ``--kill-one`` terminates the
+first worker mid-crawl to show its leases being reassigned after they run
+out. Nothing touches the network.
+
+Workers and the mock server share this machine's cores, so the speedup
+flattens once they are busy; on separate nodes each worker brings its own.
+"""
+import os
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+from bench_common import free_port, wait_until_serving
+import mock_neurips
+from mock_neurips import MockConfig
+from neurips_engine import ScraperEngine
+from work_queue import open_queue
+
+CONNECTIONS_PER_WORKER = 4
+WORKER_LEASE_SECONDS = 3  # Short, so a terminated worker's tasks come back quickly
+
+
+def mock_engine(url, **kwargs):
+    class MockEngine(ScraperEngine):
+        EXPORT_CSV = False
+        CONNECTION_LIMIT_PER_HOST = CONNECTIONS_PER_WORKER
+        MAX_CONCURRENT_DOWNLOADS = CONNECTIONS_PER_WORKER
+        LEASE_SECONDS = WORKER_LEASE_SECONDS
+        QUEUE_POLL_INTERVAL = 0.2
+        PARSE_PROCESSES = 0        # Small indexes; a process pool per scrape task would dominate
+
+        @staticmethod
+        def year_urls(year):
+            return f"{url}/paper/{year}", f"{url}/paper_files/paper/{year}/file"
+
+    return MockEngine(**kwargs)
+
+
+def worker(url, queue_path, worker_id):
+    os.chdir(tempfile.mkdtemp())
+    engine = mock_engine(url, download_dir='pdfs', store_path='papers.sqlite')
+    queue = open_queue(queue_path)
+    try:
+        engine.run(engine.work(queue, worker_id))
+    finally:
+        queue.close()
+        engine.close()
+
+
+def crawl(url, config, workers, shards, kill_one):
+    context = multiprocessing.get_context('spawn')
+    directory = tempfile.mkdtemp()
+    queue_path = os.path.join(directory, 'crawl_queue.sqlite')
+    queue = open_queue(queue_path)
+    coordinator = mock_engine(url, download_dir=os.path.join(directory, 'pdfs'),
+                              store_path=os.path.join(directory, 'papers.sqlite'))
+    processes = [context.Process(target=worker, args=(url, queue_path, f"worker-{i}"))
+                 for i in range(workers)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    if kill_one:
+        def on_event(kind, data):
+            if kind == 'progress' and data['percent'] > 20 and processes[0].is_alive():
+                processes[0].terminate()
+                print("  terminated worker-0")
+        coordinator.on_event = on_event
+    try:
+        totals = coordinator.coordinate(queue, config.years[0], config.years[-1], shards)
+        wall = time.perf_counter() - started
+        for process in processes:
+            process.join()
+        return totals, wall, queue.counts(), queue.failed()
+    finally:
+        for process in processes:
+            process.terminate()
+        queue.close()
+        coordinator.close()
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark distributed crawling against a local mock server.")
+    arg_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help="worker counts to try")
+    arg_parser.add_argument('--papers', type=int, default=mock_neurips.PAPERS_PER_YEAR,
+                            help="papers per year (default: %(default)s)")
+    arg_parser.add_argument('--pdf-kb', type=int, default=64, help="PDF size (default: %(default)s)")
+    arg_parser.add_argument('--latency', type=float, default=0.05, help="seconds per response (default: %(default)s)")
+    arg_parser.add_argument('--shards', type=int, default=8, help="download tasks per year (default: %(default)s)")
+    arg_parser.add_argument('--kill-one', action='store_true', help="terminate one worker mid-crawl")
+    args = arg_parser.parse_args(argv)
+
+    config = MockConfig(mock_neurips.YEARS, args.papers, args.pdf_kb * 1024, args.latency)
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    server = multiprocessing.get_context('spawn').Process(target=mock_neurips.serve, args=(port, config), daemon=True)
+    server.start()
+    try:
+        wait_until_serving(url)
+        print(f"{len(config.years)} years x {args.papers} papers, {args.pdf_kb} KiB PDFs, "
+              f"{args.latency * 1000:.0f} ms latency, {CONNECTIONS_PER_WORKER} connections per worker")
+        for workers in args.workers:
+            totals, wall, counts, failed = crawl(url, config, workers, args.shards, args.kill_one)
+            rate = totals['downloaded'] / wall
+            print(f"{workers} workers: {totals['papers']} papers, {totals['downloaded']} PDFs in {wall:.2f}s, "
+                  f"{rate:.1f} papers/s ({rate / workers:.1f} per worker)")
+            print(f"  tasks {dict(sorted(counts.items()))}, given up {failed}")
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""End-to-end throughput of Scrapper.py and the async engine against the mock server.
+
+    python benchmarks/bench_end_to_end.py [--papers 200] [--latency 0.05] [--error-rate 0.01] [--only engine]
+    python benchmarks/bench_end_to_end.py --start 2016 --end 2016 --papers 100 --pdf-kb 20480 --concurrency 50
+
+Each workload runs in a fresh process, in its own temporary directory, with a
+fresh mock server (see mock_neurips.py) in another process, so caches, the
+manifest and the content store start cold and the client's CPU time and peak
+RSS are not mixed up with the server's. Reported per workload: papers/s and
+MB/s of PDFs, server-side p50/p99 latency for pages and PDFs, the most
+requests the server had in flight at once, peak RSS, CPU time and the HTTP
+status counts. With ``--concurrency`` both clients run that many downloads at
+once from the start (no rate limiter ramp-up), which with large PDFs shows
+that memory stays flat: bodies are streamed in chunks, never buffered whole.
+Nothing touches the network.
+"""
+import io
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import tempfile
+import contextlib
+import urllib.request
+import multiprocessing
+
+from bench_common import free_port, wait_until_serving
+import mock_neurips
+from mock_neurips import MockConfig
+from rate_limiter import RateLimitedAdapter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+WORKLOADS = ('scrapper', 'engine')
+
+
+def server_stats(url):
+    with urllib.request.urlopen(url + '/stats', timeout=10) as response:
+        return json.load(response)
+
+
+def usage():
+    """(CPU seconds including child processes, peak RSS in MiB or None)."""
+    if resource is None:
+        return time.process_time(), None
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in KiB on Linux and in bytes on macOS.
+    rss_unit = 2**20 if sys.platform == 'darwin' else 2**10
+    return (own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime,
+            own.ru_maxrss / rss_unit)
+
+
+def run_scrapper(url, years, concurrency):
+    import Scrapper
+    Scrapper.BASE_URL = url
+    if concurrency:
+        Scrapper.DOWNLOAD_THREADS = concurrency
+        Scrapper.rate_limiter.controller_options.update(rate=float(concurrency), concurrency=concurrency,
+                                                        max_concurrency=concurrency)
+        Scrapper.adapter = RateLimitedAdapter(Scrapper.rate_limiter, max_retries=Scrapper.retry,
+                                              pool_maxsize=Scrapper.POOL_SIZE + concurrency)
+        Scrapper.session.mount('http://', Scrapper.adapter)
+    with contextlib.redirect_stdout(io.StringIO()):
+        Scrapper.main()
+    return sum(1 for entry in Scrapper.manifest.entries.values() if entry.get('complete'))
+
+
+def run_engine(url, years, concurrency):
+    from neurips_engine import ScraperEngine
+
+    class MockEngine(ScraperEngine):
+        if concurrency:
+            MAX_CONCURRENT_DOWNLOADS = INITIAL_HOST_CONCURRENCY = CONNECTION_LIMIT_PER_HOST = concurrency
+            CONNECTION_LIMIT = max(ScraperEngine.CONNECTION_LIMIT, concurrency)
+            RATE_LIMIT = float(concurrency)
+
+        @staticmethod
+        def year_urls(year):
+            return f"{url}/paper/{year}", f"{url}/paper_files/paper/{year}/file"
+
+    engine = MockEngine(download_dir='pdfs', store_path='papers.sqlite', csv_path='papers.csv')
+    engine.run(engine.scrape_range(years[0], years[-1]))
+    stats = engine.run(engine.download_all(engine.load_metadata()))
+    engine.close()
+    return stats['downloaded']
+
+
+def workload(name, url, years, concurrency, results):
+    """Child process body: runs one client in a temporary directory and reports its usage."""
+    os.chdir(tempfile.mkdtemp())
+    started = time.perf_counter()
+    cpu_before, _ = usage()
+    papers = {'scrapper': run_scrapper, 'engine': run_engine}[name](url, years, concurrency)
+    wall = time.perf_counter() - started
+    cpu, peak_rss = usage()
+    results.put({'papers': papers, 'wall': wall, 'cpu': cpu - cpu_before, 'peak_rss': peak_rss})
+
+
+def run(name, config, concurrency=None):
+    context = multiprocessing.get_context('spawn')
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    server = context.Process(target=mock_neurips.serve, args=(port, config), daemon=True)
+    server.start()
+    try:
+        wait_until_serving(url)
+        results = context.Queue()
+        client = context.Process(target=workload, args=(name, url, config.years, concurrency, results))
+        client.start()
+        while True:
+            try:
+                result = results.get(timeout=1)
+                break
+            except queue.Empty:
+                if not client.is_alive():
+                    raise RuntimeError(f"{name} workload exited with code {client.exitcode}")
+        client.join()
+        result['server'] = server_stats(url)
+    finally:
+        server.terminate()
+        server.join()
+    return result
+
+
+def report(name, result):
+    server = result['server']
+    wall = result['wall']
+
+    def ms(kind, percentile):
+        value = server['latency'][kind][percentile]
+        return f"{value * 1000:.0f}" if value is not None else '-'
+    print(f"{name}")
+    print(f"  {result['papers']} PDFs in {wall:.2f}s: {result['papers'] / wall:.1f} papers/s, "
+          f"{server['bytes_sent'] / 2**20 / wall:.1f} MB/s")
+    print(f"  latency ms  pages p50 {ms('page', 'p50')} p99 {ms('page', 'p99')}, "
+          f"PDFs p50 {ms('pdf', 'p50')} p99 {ms('pdf', 'p99')}; at most {server['max_in_flight']} in flight")
+    rss = f"{result['peak_rss']:.0f} MiB" if result['peak_rss'] is not None else 'n/a'
+    print(f"  peak RSS {rss}, CPU {result['cpu']:.2f}s ({result['cpu'] / wall * 100:.0f}% of one core)")
+    print(f"  HTTP statuses {server['statuses']}")
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark the scrapers against a local mock server.")
+    arg_parser.add_argument('--start', type=int, default=2016, help="first year (default: %(default)s)")
+    arg_parser.add_argument('--end', type=int, default=2019, help="last year (default: %(default)s)")
+    arg_parser.add_argument('--papers', type=int, default=mock_neurips.PAPERS_PER_YEAR,
+                            help="papers per year (default: %(default)s)")
+    arg_parser.add_argument('--pdf-kb', type=int, default=mock_neurips.PDF_SIZE // 1024,
+                            help="PDF size (default: %(default)s)")
+    arg_parser.add_argument('--latency', type=float, default=0.02, help="seconds per response (default: %(default)s)")
+    arg_parser.add_argument('--jitter', type=float, default=0.0, help="up to this many extra seconds")
+    arg_parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of HTTP 500 responses")
+    arg_parser.add_argument('--max-concurrency', type=int, help="in-flight requests before the server sends 429")
+    arg_parser.add_argument('--rate', type=float, help="requests/s before the server sends 429")
+    arg_parser.add_argument('--concurrency', type=int,
+                            help="concurrent downloads per client, at full speed from the start "
+                                 "(default: each client's own setting and ramp-up)")
+    arg_parser.add_argument('--only', choices=WORKLOADS, help="run a single workload")
+    args = arg_parser.parse_args(argv)
+
+    config = MockConfig(range(args.start, args.end + 1), args.papers, args.pdf_kb * 1024, args.latency,
+                        args.jitter, args.error_rate, args.max_concurrency, args.rate)
+    print(f"{len(config.years)} years x {args.papers} papers, {args.pdf_kb} KiB PDFs, "
+          f"{args.latency * 1000:.0f} ms latency, {args.error_rate:.1%} errors")
+    for name in ([args.only] if args.only else WORKLOADS):
+        report(name, run(name, config, args.concurrency))
+
+
+if __name__ == '__main__':
+    main()
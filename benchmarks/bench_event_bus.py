@@ -0,0 +1,108 @@
+"""UI overhead of download progress reporting, per-event versus coalesced.
+
+    python benchmarks/bench_event_bus.py [papers]
+
+Replays the events a download run emits (a log line, a stats update and a
+progress update per paper) and times applying them to the log, stats and
+progress widgets one by one (previous behaviour) against publishing them to
+an EventBus and draining it on the UI tick. The widget part needs a display;
+the bus itself is timed anywhere.
+"""
+import sys
+import time
+
+import bench_common  # puts the repository root on sys.path
+from event_bus import EventBus
+
+PAPERS = 10000
+EVENTS_PER_TICK = 600  # Roughly 100 ms worth of events from a fast download run
+
+
+def paper_events(papers=PAPERS):
+    for i in range(papers):
+        yield 'log', {'message': f"Downloading: Paper_title_number_{i} (2023)"}
+        yield 'stats', {'downloaded': i + 1}
+        yield 'progress', {'percent': (i + 1) / papers * 100}
+
+
+def replay(bus, events, apply):
+    """Publishes the events in tick-sized bursts and drains after each; returns the number of drained updates."""
+    updates = 0
+    events = list(events)
+    for start in range(0, len(events), EVENTS_PER_TICK):
+        for kind, data in events[start:start + EVENTS_PER_TICK]:
+            bus.publish(kind, data)
+        for kind, data in bus.drain():
+            apply(kind, data)
+            updates += 1
+    return updates
+
+
+def bench_bus(papers):
+    events = list(paper_events(papers))
+    start = time.perf_counter()
+    updates = replay(EventBus(), events, lambda kind, data: None)
+    seconds = time.perf_counter() - start
+    print(f"EventBus ({len(events)} events for {papers} papers)")
+    print(f"  publish + drain                  {seconds * 1000:9.1f} ms, {updates} coalesced updates")
+
+
+def bench_tk(papers):
+    import tkinter as tk
+    from tkinter import ttk, scrolledtext
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"Tk unavailable ({e}), skipping the widget benchmark")
+        return
+    log_area = scrolledtext.ScrolledText(root, height=6)
+    log_area.pack()
+    label = ttk.Label(root, text="0")
+    label.pack()
+    progress_var = tk.DoubleVar()
+    ttk.Progressbar(root, variable=progress_var, maximum=100).pack()
+    root.update()
+
+    def apply_one(kind, data):
+        if kind == 'log':
+            log_area.insert(tk.END, f"{data['message']}\n")
+            log_area.see(tk.END)
+        elif kind == 'stats':
+            label.config(text=str(data['downloaded']))
+        else:
+            progress_var.set(data['percent'])
+
+    def apply_batch(kind, data):
+        if kind == 'log':
+            log_area.insert(tk.END, ''.join(f"{message}\n" for message in data))
+            excess = int(log_area.index('end-1c').split('.')[0]) - 1 - 2000
+            if excess > 0:
+                log_area.delete('1.0', f'{excess + 1}.0')
+            log_area.see(tk.END)
+        else:
+            apply_one(kind, data)
+
+    print(f"Widgets ({papers} papers)")
+    start = time.perf_counter()
+    for kind, data in paper_events(papers):
+        apply_one(kind, data)
+    root.update()
+    print(f"  per event (previous)             {(time.perf_counter() - start) * 1000:9.1f} ms, "
+          f"{int(log_area.index('end-1c').split('.')[0])} log lines kept")
+
+    log_area.delete('1.0', tk.END)
+    start = time.perf_counter()
+    updates = replay(EventBus(), paper_events(papers), apply_batch)
+    root.update()
+    print(f"  coalesced per tick               {(time.perf_counter() - start) * 1000:9.1f} ms, "
+          f"{updates} updates, {int(log_area.index('end-1c').split('.')[0])} log lines kept")
+    root.destroy()
+
+
+def main(papers):
+    bench_bus(papers)
+    bench_tk(papers)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else PAPERS)
@@ -0,0 +1,85 @@
+"""Loads and queries paper metadata from the CSV and from the metadata stores.
+
+    python benchmarks/bench_metadata_store.py [papers_per_year]
+
+Builds 20 years of synthetic metadata, then times reading one year the old
+way (csv.DictReader over the whole file) against the SQLite and, when pyarrow
+is installed, Parquet stores, and compares the memory held by dict rows and
+Paper records.
+"""
+import os
+import sys
+import csv
+import tempfile
+import tracemalloc
+
+from bench_common import timed
+import metadata_store
+from metadata_store import Paper, open_store
+
+YEARS = range(2005, 2025)
+PAPERS_PER_YEAR = 3000
+QUERY_YEAR = 2015
+
+
+def synthetic_papers(per_year=PAPERS_PER_YEAR):
+    return [Paper(f"Paper title number {i} from {year}", f"Author A{i % 977}, Author B{i % 313}", year,
+                  f"https://papers.nips.cc/paper_files/paper/{year}/file/{year:04d}{i:028x}-Paper.pdf",
+                  f"{year:04d}{i:028x}")
+            for year in YEARS for i in range(per_year)]
+
+
+def held_bytes(func):
+    tracemalloc.start()
+    result = func()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main(per_year):
+    papers = synthetic_papers(per_year)
+    directory = tempfile.mkdtemp()
+    csv_path = os.path.join(directory, 'metadata.csv')
+    print(f"{len(papers)} papers over {len(YEARS)} years, querying {QUERY_YEAR}")
+
+    print("CSV (previous)")
+    store = open_store(os.path.join(directory, 'metadata.sqlite'))
+    store.upsert(papers)
+    timed("export", lambda: store.export_csv(csv_path))
+
+    def csv_year():
+        with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+            return [row for row in csv.DictReader(f) if row['year'] == str(QUERY_YEAR)]
+    rows = timed(f"load all, keep {QUERY_YEAR}", csv_year)
+
+    def csv_all():
+        with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+    _, dict_bytes = held_bytes(csv_all)
+
+    backends = [('SQLite', 'metadata.sqlite')]
+    if metadata_store.HAVE_PYARROW:
+        backends.append(('Parquet', 'metadata.parquet'))
+    else:
+        print("Parquet: pyarrow not installed")
+    for name, filename in backends:
+        print(name)
+        store = open_store(os.path.join(directory, filename))
+        if store.count() == 0:
+            timed("upsert all", lambda: store.upsert(papers))
+        timed("upsert one year again", lambda: store.upsert([p for p in papers if p.year == QUERY_YEAR]))
+        found = timed(f"load {QUERY_YEAR}", lambda: list(store.iter_papers(QUERY_YEAR, QUERY_YEAR)))
+        assert len(found) == len(rows), f"{name} returned {len(found)} papers, CSV {len(rows)}"
+        timed(f"count {QUERY_YEAR}", lambda: store.count(QUERY_YEAR, QUERY_YEAR))
+        timed("stream all", lambda: sum(1 for _ in store.iter_papers()))
+        store.close()
+
+    _, paper_bytes = held_bytes(lambda: list(open_store(os.path.join(directory, 'metadata.sqlite')).iter_papers()))
+    print("Memory for all rows")
+    print(f"  {'csv.DictReader dicts':<36} {dict_bytes / 2**20:9.1f} MiB")
+    print(f"  {'Paper records':<36} {paper_bytes / 2**20:9.1f} MiB")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else PAPERS_PER_YEAR)
@@ -0,0 +1,65 @@
+"""Cost of the stage instrumentation, disabled and enabled.
+
+    python benchmarks/bench_metrics.py [calls]
+
+Times ``timer()`` blocks, ``observe()`` and ``inc()`` per call with metrics
+off (the default) and on, and how long exporting a registry with a realistic
+number of series takes.
+"""
+import sys
+import time
+
+from bench_common import timed
+from metrics import Metrics
+
+CALLS = 200000
+HOSTS = ('papers.nips.cc', 'proceedings.neurips.cc')
+STAGES = ('dns', 'connect', 'ttfb', 'fetch', 'parse', 'transfer', 'write', 'download')
+
+
+def per_call(label, func, calls):
+    start = time.perf_counter()
+    func(calls)
+    print(f"  {label:<36} {(time.perf_counter() - start) / calls * 1e9:9.0f} ns/call")
+
+
+def main(calls):
+    def baseline(n):
+        for _ in range(n):
+            pass
+    for enabled in (False, True):
+        metrics = Metrics(enabled=enabled)
+        print(f"Metrics {'enabled' if enabled else 'disabled'}")
+        per_call("empty loop", baseline, calls)
+
+        def timer(n):
+            for _ in range(n):
+                with metrics.timer('parse', 'papers.nips.cc'):
+                    pass
+        per_call("with timer()", timer, calls)
+
+        def observe(n):
+            for i in range(n):
+                metrics.observe('ttfb', 'papers.nips.cc', i * 1e-6)
+        per_call("observe()", observe, calls)
+
+        def inc(n):
+            for _ in range(n):
+                metrics.inc('http_responses', 'papers.nips.cc', status=200)
+        per_call("inc() with a label", inc, calls)
+
+    metrics = Metrics()
+    for host in HOSTS:
+        for stage in STAGES:
+            for i in range(1000):
+                metrics.observe(stage, host, i * 1e-3)
+        for status in (200, 206, 304, 404, 429, 500, 503):
+            metrics.inc('http_responses', host, status=status)
+    print(f"Export ({len(metrics.histograms)} histograms, {len(metrics.counters)} counters)")
+    text = timed("prometheus_text()", metrics.prometheus_text)
+    timed("summary()", metrics.summary)
+    print(f"  {len(text.splitlines())} lines of Prometheus text")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else CALLS)
@@ -0,0 +1,104 @@
+"""Compares the parser backends on year index and abstract pages.
+
+    python benchmarks/bench_parsers.py [saved_page.html ...]
+
+Saved pages are treated as year indexes when they contain a paper-list,
+otherwise as abstract pages. Without arguments a synthetic 3,500-paper year
+index and abstract page in the NeurIPS markup are used. Speedups are relative
+to the full-soup parse and extraction the scrapers did before the backends.
+"""
+import sys
+import time
+
+import bench_common  # puts the repository root on sys.path
+import parsers
+from bs4 import BeautifulSoup
+
+REPEATS = 5
+INDEX_BASELINE_REPEATS = 1  # The full soup takes seconds per year index; one run is steady enough
+
+
+class FullSoup:
+    """The previous behaviour: a full html.parser tree, then the scrapers' own extraction."""
+
+    @staticmethod
+    def year_index(html):
+        # As the Tk scraper's scrape_year did it. find_next('i') walks on to the end of
+        # the document when an entry has no <i>, as in the synthetic index.
+        records = []
+        for paper_link in BeautifulSoup(html, 'html.parser').select("a[title='paper title']"):
+            authors_tag = paper_link.find_next('i')
+            records.append({'title': paper_link.text.strip(),
+                            'authors': authors_tag.text.strip() if authors_tag else "",
+                            'href': paper_link.get('href', '')})
+        return records
+
+    @staticmethod
+    def paper_page(html):
+        # As Scrapper.process_paper did it.
+        soup = BeautifulSoup(html, 'html.parser')
+        title_tag = soup.select_one("h4")
+        pdf_link = soup.select_one("a[href$='.pdf']")
+        return {'title': title_tag.text.strip() if title_tag else None,
+                'pdf_href': pdf_link["href"] if pdf_link else None}
+
+
+def synthetic_year_index(papers=3500, year=2023):
+    items = ''.join(
+        f'<li class="conference"><div class="paper-content">'
+        f'<a title="paper title" href="/paper_files/paper/{year}/hash/{i:032x}-Abstract-Conference.html">'
+        f'Paper &amp; title number {i}</a>'
+        f'<span class="paper-authors">Author A{i}, Author B{i}</span></div></li>\n'
+        for i in range(papers))
+    return (f'<html><head><title>NeurIPS {year}</title></head><body><div class="container-fluid">'
+            f'<h2>Advances in Neural Information Processing Systems</h2>'
+            f'<ul class="paper-list">\n{items}</ul></div></body></html>')
+
+
+def synthetic_paper_page(year=2023):
+    filler = '<p>' + 'Lorem ipsum dolor sit amet. ' * 400 + '</p>'
+    return (f'<html><body><div class="container-fluid"><h4>A Synthetic Paper Title</h4>'
+            f'<a href="/paper_files/paper/{year}/file/{0:032x}-Paper-Conference.pdf">Paper</a>'
+            f'<a href="/paper_files/paper/{year}/file/{0:032x}-Supplemental-Conference.zip">Supplemental</a>'
+            f'<h4>Abstract</h4>{filler}</div></body></html>')
+
+
+def best_time(func, html, repeats=REPEATS):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(html)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def bench(kind, html):
+    print(f"{kind} ({len(html) / 1024:.0f} KiB)")
+    repeats = INDEX_BASELINE_REPEATS if kind == 'year_index' else REPEATS
+    baseline, _ = best_time(getattr(FullSoup, kind), html, repeats)
+    print(f"  {'full soup':<11} {baseline * 1000:8.2f} ms  (previous behaviour)")
+    for name in ('strainer', 'regex', 'lxml', 'selectolax'):
+        if name not in parsers.BACKENDS:
+            print(f"  {name:<11} not installed")
+            continue
+        seconds, result = best_time(getattr(parsers.BACKENDS[name], kind), html)
+        if kind == 'year_index':
+            reference = parsers.StrainerParser.year_index(html)
+            assert result == reference, f"{name} disagrees with strainer"
+        print(f"  {name:<11} {seconds * 1000:8.2f} ms  x{baseline / seconds:5.1f}")
+
+
+def main(paths):
+    if not paths:
+        bench('year_index', synthetic_year_index())
+        bench('paper_page', synthetic_paper_page())
+        return
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        print(path)
+        bench('year_index' if 'paper-list' in html else 'paper_page', html)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
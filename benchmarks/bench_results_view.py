@@ -0,0 +1,87 @@
+"""Loads a large result set into the results view, old and new way.
+
+    python benchmarks/bench_results_view.py [rows]
+
+Times inserting every paper as a Treeview item (previous behaviour) against
+the virtualized PaperTable, and the PaperStore filter and sort operations
+behind it. The Tk part needs a display; the store part runs anywhere.
+"""
+import sys
+import time
+
+from bench_common import timed
+from metadata_store import Paper
+from paper_table import COLUMNS, PaperStore
+
+ROWS = 50000
+
+
+def synthetic_papers(rows=ROWS):
+    return [Paper(f"Paper title number {i} on learning", f"Author A{i % 977}, Author B{i % 313}", 1987 + i % 38,
+                  f"https://papers.nips.cc/paper_files/paper/2023/file/{i:032x}-Paper.pdf", f"{i:032x}")
+            for i in range(rows)]
+
+
+def bench_store(papers):
+    print(f"PaperStore ({len(papers)} rows)")
+    store = PaperStore()
+    timed("extend", lambda: store.extend(papers))
+    timed("filter 'author a12'", lambda: store.set_filter('author a12'))
+    timed("filter year 2020", lambda: store.set_filter('', '2020'))
+    timed("clear filter", lambda: store.set_filter())
+    timed("sort by title", lambda: store.sort('title'))
+    timed("sort by year", lambda: store.sort('year'))
+
+
+def bench_tk(papers):
+    import tkinter as tk
+    from tkinter import ttk
+    from paper_table import PaperTable
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"Tk unavailable ({e}), skipping the widget benchmark")
+        return
+    root.geometry('1200x800')
+    print(f"Treeview ({len(papers)} rows)")
+
+    tree = ttk.Treeview(root, columns=COLUMNS, show='headings')
+    tree.pack(fill=tk.BOTH, expand=True)
+
+    def insert_all():
+        for paper in papers:
+            tree.insert('', tk.END, values=(paper.title, paper.authors, paper.year, paper.pdf_link))
+        root.update()
+    timed("insert per row (previous)", insert_all)
+    timed("delete all rows (previous)", lambda: (tree.delete(*tree.get_children()), root.update()))
+    tree.destroy()
+
+    table = PaperTable(root)
+    table.pack(fill=tk.BOTH, expand=True)
+    root.update()
+
+    longest = [0.0]
+
+    def load():
+        table.add(papers)
+        while table.pending or table.drain_job is not None:
+            start = time.perf_counter()
+            root.update()
+            longest[0] = max(longest[0], time.perf_counter() - start)
+    timed("PaperTable.add until drained", load)
+    print(f"  {'longest event loop turn':<36} {longest[0] * 1000:9.1f} ms")
+    timed("scroll 1000 pages", lambda: [table.yview('scroll', 1, 'pages') for _ in range(1000)] and root.update())
+    timed("filter + render", lambda: (table.set_filter('author a12'), root.update()))
+    timed("sort + render", lambda: (table.sort_by('title'), root.update()))
+    timed("clear", lambda: (table.clear(), root.update()))
+    root.destroy()
+
+
+def main(rows):
+    papers = synthetic_papers(rows)
+    bench_store(papers)
+    bench_tk(papers)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else ROWS)
@@ -0,0 +1,73 @@
+"""Query latency of the full-text index at NeurIPS scale.
+
+    python benchmarks/bench_search_index.py [documents]   # 20,000 by default, a few minutes to build
+
+Fills an index with synthetic documents (Zipf-distributed vocabulary, about
+the length of a NeurIPS paper) without going through PDF extraction, then
+times a mix of rare, common and multi-term queries. Extraction itself runs
+in worker processes and is not measured here.
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+from collections import Counter
+
+import bench_common  # puts the repository root on sys.path
+from search_index import SearchIndex
+
+DOCUMENTS = 20000
+WORDS_PER_DOCUMENT = 6000
+VOCABULARY = 200000
+POOL_SIZE = 500
+QUERIES = ['transformer', 'w17', 'w3 w40 w900', 'w120 w121', 'w5000 w60000', 'w1 w2 w3 w4 w5 w6']
+
+
+def synthetic_terms(rng, weights):
+    words = rng.choices(range(VOCABULARY), cum_weights=weights, k=WORDS_PER_DOCUMENT)
+    counts = Counter(f"w{word}" for word in words)
+    if rng.random() < 0.01:
+        counts['transformer'] += 3
+    return counts
+
+
+def build(index, documents):
+    rng = random.Random(0)
+    weights = []
+    total = 0.0
+    for rank in range(1, VOCABULARY + 1):
+        total += 1.0 / rank
+        weights.append(total)
+    # Sampling is slower than indexing, so documents are drawn from a pool.
+    pool = [synthetic_terms(rng, weights) for _ in range(POOL_SIZE)]
+    for doc in range(documents):
+        counts = pool[rng.randrange(POOL_SIZE)]
+        index.add(f"{doc:032x}", 2005 + doc % 20, f"Paper {doc}", f"paper_{doc}.pdf", 0, 0.0, '',
+                  counts, sum(counts.values()))
+        if doc % 500 == 499:
+            index.commit()
+    index.commit()
+
+
+def main(documents):
+    path = os.path.join(tempfile.mkdtemp(), 'index.sqlite')
+    index = SearchIndex(path)
+    start = time.perf_counter()
+    build(index, documents)
+    print(f"Indexed {documents} synthetic documents in {time.perf_counter() - start:.1f}s "
+          f"({os.path.getsize(path) / 2**20:.0f} MiB)")
+    for query in QUERIES:
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            results = index.search(query, limit=10)
+            timings.append(time.perf_counter() - start)
+        print(f"  {query!r:<28} {min(timings) * 1000:8.1f} ms  {len(results)} results")
+    start = time.perf_counter()
+    results = index.search('w3 w40', limit=10, start_year=2015, end_year=2015)
+    print(f"  {'w3 w40, year 2015':<28} {(time.perf_counter() - start) * 1000:8.1f} ms  {len(results)} results")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DOCUMENTS)
@@ -0,0 +1,205 @@
+"""Local stand-in for papers.nips.cc, for benchmarks that must not hit the network.
+
+    python benchmarks/mock_neurips.py --port 8765 --papers 500 --latency 0.05
+
+Serves the proceedings front page, per-year indexes (``ul.paper-list`` with
+``a[title='paper title']`` links and ``<i>`` authors), abstract pages (``h4``
+title plus the PDF link) and PDFs of a configurable size, under both the
+``/paper/<year>`` and ``/paper_files/paper/<year>`` schemes the scrapers use.
+Every PDF starts with its paper hash, so no two papers share content.
+
+Latency, server errors and throttling can be injected; ``/stats`` returns
+request counts, bytes sent, the most requests in flight at once and latency
+percentiles as seen by the server.
+"""
+import sys
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+
+from aiohttp import web
+
+YEARS = range(2016, 2020)
+PAPERS_PER_YEAR = 200
+PDF_SIZE = 256 * 1024
+
+
+class MockConfig:
+    """What the server serves and how badly it behaves."""
+
+    def __init__(self, years=YEARS, papers_per_year=PAPERS_PER_YEAR, pdf_size=PDF_SIZE, latency=0.0,
+                 jitter=0.0, error_rate=0.0, max_concurrency=None, rate=None, retry_after=1, seed=0):
+        self.years = list(years)
+        self.papers_per_year = papers_per_year
+        self.pdf_size = pdf_size
+        self.latency = latency                  # Seconds added to every response
+        self.jitter = jitter                    # Up to this many extra seconds, uniformly random
+        self.error_rate = error_rate            # Fraction of requests answered with HTTP 500
+        self.max_concurrency = max_concurrency  # Requests beyond this many in flight get 429
+        self.rate = rate                        # Requests/s beyond this get 429
+        self.retry_after = retry_after          # Retry-After seconds sent with 429
+        self.seed = seed
+
+
+def paper_hash(year, i):
+    return f"{year:04d}{i:028x}"
+
+
+def paper_title(year, i):
+    return f"Synthetic paper {i} on learning representations ({year})"
+
+
+class MockNeurIPS:
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.filler = self.random.randbytes(config.pdf_size)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.tokens = float(config.rate or 0)
+        self.last_refill = time.monotonic()
+        self.statuses = Counter()
+        self.bytes_sent = 0
+        self.latencies = {'page': [], 'pdf': []}
+
+    def app(self):
+        app = web.Application(middlewares=[self.misbehave])
+        app.router.add_get('/', self.front_page)
+        app.router.add_get('/stats', self.stats)
+        for prefix in ('/paper', '/paper_files/paper'):
+            app.router.add_get(prefix + '/{year:\\d+}', self.year_index)
+            app.router.add_get(prefix + '/{year:\\d+}/hash/{hash}-Abstract.html', self.abstract)
+            app.router.add_get(prefix + '/{year:\\d+}/file/{hash}-Paper.pdf', self.pdf)
+        return app
+
+    def throttled(self):
+        config = self.config
+        if config.max_concurrency is not None and self.in_flight >= config.max_concurrency:
+            return True
+        if config.rate:
+            now = time.monotonic()
+            self.tokens = min(config.rate, self.tokens + (now - self.last_refill) * config.rate)
+            self.last_refill = now
+            if self.tokens < 1:
+                return True
+            self.tokens -= 1
+        return False
+
+    @web.middleware
+    async def misbehave(self, request, handler):
+        if request.path == '/stats':
+            return await handler(request)
+        started = time.perf_counter()
+        config = self.config
+        if self.throttled():
+            response = web.Response(status=429, headers={'Retry-After': str(config.retry_after)})
+        else:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                delay = config.latency + self.random.uniform(0, config.jitter)
+                if delay:
+                    await asyncio.sleep(delay)
+                if self.random.random() < config.error_rate:
+                    response = web.Response(status=500, text="injected error")
+                else:
+                    try:
+                        response = await handler(request)
+                    except web.HTTPException as e:
+                        response = web.Response(status=e.status, text=e.text)
+                    await response.prepare(request)
+                    await response.write_eof()
+            finally:
+                self.in_flight -= 1
+        self.statuses[response.status] += 1
+        self.bytes_sent += response.body_length if response.prepared else len(response.body or b'')
+        kind = 'pdf' if request.path.endswith('.pdf') else 'page'
+        self.latencies[kind].append(time.perf_counter() - started)
+        return response
+
+    async def front_page(self, request):
+        links = ''.join(f'<li><a href="/paper_files/paper/{year}">Advances in NeurIPS {year}</a></li>'
+                        for year in self.config.years)
+        return web.Response(text=f'<html><body><ul>{links}</ul></body></html>', content_type='text/html')
+
+    def check_year(self, request):
+        year = int(request.match_info['year'])
+        if year not in self.config.years:
+            raise web.HTTPNotFound()
+        return year
+
+    async def year_index(self, request):
+        year = self.check_year(request)
+        items = ''.join(
+            f'<li class="conference"><div class="paper-content">'
+            f'<a title="paper title" href="/paper_files/paper/{year}/hash/{paper_hash(year, i)}-Abstract.html">'
+            f'{paper_title(year, i)}</a> <i>Author A{i % 977}, Author B{i % 313}</i></div></li>\n'
+            for i in range(self.config.papers_per_year))
+        return web.Response(text=f'<html><body><ul class="paper-list">\n{items}</ul></body></html>',
+                            content_type='text/html')
+
+    async def abstract(self, request):
+        year = self.check_year(request)
+        h = request.match_info['hash']
+        i = int(h[4:], 16)
+        return web.Response(text=f'<html><body><h4>{paper_title(year, i)}</h4>'
+                                 f'<a href="/paper_files/paper/{year}/file/{h}-Paper.pdf">Paper</a></body></html>',
+                            content_type='text/html')
+
+    async def pdf(self, request):
+        self.check_year(request)
+        h = request.match_info['hash']
+        body = b'%PDF-1.4\n% ' + h.encode() + b'\n' + self.filler
+        headers = {'ETag': f'"{h}"', 'Accept-Ranges': 'bytes'}
+        offset = 0
+        if request.http_range.start is not None and request.headers.get('If-Range', headers['ETag']) == headers['ETag']:
+            offset = request.http_range.start
+            if offset >= len(body):
+                return web.Response(status=416, headers={'Content-Range': f'bytes */{len(body)}'})
+            headers['Content-Range'] = f'bytes {offset}-{len(body) - 1}/{len(body)}'
+        return web.Response(status=206 if offset else 200, body=body[offset:], headers=headers,
+                            content_type='application/pdf')
+
+    async def stats(self, request):
+        def percentiles(values):
+            values = sorted(values)
+            if not values:
+                return {'p50': None, 'p99': None}
+            return {'p50': values[len(values) // 2], 'p99': values[min(len(values) - 1, len(values) * 99 // 100)]}
+        return web.json_response({
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+            'bytes_sent': self.bytes_sent,
+            'max_in_flight': self.max_in_flight,
+            'pdfs': len(self.latencies['pdf']),
+            'latency': {kind: percentiles(values) for kind, values in self.latencies.items()},
+        })
+
+
+def serve(port, config: MockConfig, host='127.0.0.1'):
+    """Runs the mock server until the process is stopped."""
+    web.run_app(MockNeurIPS(config).app(), host=host, port=port, print=None, access_log=None)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Serve synthetic NeurIPS proceedings locally.")
+    arg_parser.add_argument('--port', type=int, default=8765)
+    arg_parser.add_argument('--start', type=int, default=YEARS.start, help="first year (default: %(default)s)")
+    arg_parser.add_argument('--end', type=int, default=YEARS.stop - 1, help="last year (default: %(default)s)")
+    arg_parser.add_argument('--papers', type=int, default=PAPERS_PER_YEAR, help="papers per year (default: %(default)s)")
+    arg_parser.add_argument('--pdf-kb', type=int, default=PDF_SIZE // 1024, help="PDF size (default: %(default)s)")
+    arg_parser.add_argument('--latency', type=float, default=0.0, help="seconds added per response")
+    arg_parser.add_argument('--jitter', type=float, default=0.0, help="up to this many extra seconds")
+    arg_parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of HTTP 500 responses")
+    arg_parser.add_argument('--max-concurrency', type=int, help="in-flight requests before 429")
+    arg_parser.add_argument('--rate', type=float, help="requests/s before 429")
+    args = arg_parser.parse_args(argv)
+    print(f"Serving synthetic proceedings on http://127.0.0.1:{args.port}", flush=True)
+    serve(args.port, MockConfig(range(args.start, args.end + 1), args.papers, args.pdf_kb * 1024, args.latency,
+                                args.jitter, args.error_rate, args.max_concurrency, args.rate))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
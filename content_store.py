@@ -0,0 +1,274 @@
+"""Content-addressed storage for downloaded PDFs.
+
+Every PDF is stored once, under its SHA-256, in ``.objects/ab/abcd....pdf``
+inside the download directory. The names people browse (``Title_2023.pdf``)
+are hard links to those objects, or symlinks and then copies where the
+filesystem cannot hard link, so mirrors, reruns and the two naming schemes
+of ``Scrapper.py`` and the engine all share one copy on disk. A small SQLite
+index maps each readable name to its object and to the paper hash it was
+downloaded for, which makes "already have it" a primary-key lookup instead
+of a guess at a file name.
+"""
+import os
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+
+from download_manifest import hash_file
+
+OBJECTS_DIRNAME = '.objects'
+NAMES_FILENAME = 'names.sqlite'
+INCOMING_DIRNAME = 'incoming'
+
+
+class ContentStore:
+    """PDF objects keyed by SHA-256 plus the readable names that point at them.
+
+    Names are relative to ``directory`` and unique; a paper keeps the name it
+    asked for unless another paper already holds or has reserved it, in which
+    case the first eight characters of its paper hash are appended instead of
+    overwriting. A name registered for one paper is never repointed at another.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.objects_dir = self.directory / OBJECTS_DIRNAME
+        (self.objects_dir / INCOMING_DIRNAME).mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._reserved = {}  # name -> paper hash, for downloads still in flight
+        self._db = sqlite3.connect(str(self.objects_dir / NAMES_FILENAME), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS names (
+                name TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                paper_hash TEXT,
+                title TEXT,
+                year INTEGER
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS names_paper ON names (paper_hash)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS names_sha256 ON names (sha256)")
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def object_path(self, sha256):
+        return self.objects_dir / sha256[:2] / f"{sha256}.pdf"
+
+    def staging_path(self, key):
+        """Where a download for key is written before its hash is known."""
+        return self.objects_dir / INCOMING_DIRNAME / f"{key}.pdf"
+
+    def lookup(self, paper_hash):
+        """SHA-256 of the stored PDF for paper_hash, or None if it has not been downloaded."""
+        with self._lock:
+            row = self._db.execute("SELECT sha256 FROM names WHERE paper_hash = ? LIMIT 1", (paper_hash,)).fetchone()
+        if row is None or not self.object_path(row[0]).exists():
+            return None
+        return row[0]
+
+    def name_for(self, paper_hash, name):
+        """The readable name paper_hash uses: name itself unless another paper holds or reserved it.
+
+        A paper that already has one of the candidate names registered keeps it.
+        Names registered without a paper hash (by dedupe) are free to claim. The
+        answer is reserved for paper_hash until the store is closed, so two
+        same-title papers downloading at once get different names even though
+        neither is registered until its download finishes.
+        """
+        if paper_hash is None:
+            return name
+        candidates = self._candidates(name, paper_hash)
+        with self._lock:
+            registered = {row[0] for row in self._db.execute(
+                "SELECT name FROM names WHERE paper_hash = ? AND name IN (?, ?, ?)", (paper_hash, *candidates))}
+            for candidate in candidates:
+                if candidate in registered:
+                    break
+            else:
+                for candidate in candidates:
+                    row = self._db.execute("SELECT paper_hash FROM names WHERE name = ?", (candidate,)).fetchone()
+                    if ((row is None or row[0] is None)
+                            and self._reserved.get(candidate, paper_hash) == paper_hash):
+                        break
+            self._reserved[candidate] = paper_hash
+        return candidate
+
+    @staticmethod
+    def _candidates(name, paper_hash):
+        """name, then with a short and finally the full paper hash appended; the last is always unique."""
+        stem, suffix = os.path.splitext(name)
+        return name, f"{stem}_{paper_hash[:8]}{suffix}", f"{stem}_{paper_hash}{suffix}"
+
+    def _owner(self, name):
+        """Paper hash registered for name, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT paper_hash FROM names WHERE name = ?", (name,)).fetchone()
+        return row and row[0]
+
+    def _add_object(self, path, sha256, keep):
+        """Makes path's content available as the object for sha256; returns True if it was new."""
+        target = self.object_path(sha256)
+        if target.exists():
+            if not keep:
+                os.remove(path)
+            return False
+        target.parent.mkdir(exist_ok=True)
+        if not keep:
+            os.replace(path, target)
+            return True
+        try:
+            os.link(path, target)
+        except FileExistsError:
+            return False  # another thread stored the same content first
+        except OSError:
+            tmp_path = f"{target}.tmp"
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, target)
+        return True
+
+    def link(self, sha256, path, preserve=True, paper_hash=None):
+        """Points path at the object for sha256; returns 'existing', 'hardlink', 'symlink' or 'copy'.
+
+        With preserve, a regular file at path that the index does not know about
+        is stored as an object first rather than silently replaced. With
+        paper_hash, a name registered for a different paper raises ValueError.
+        """
+        path = Path(path)
+        target = self.object_path(sha256)
+        if paper_hash is not None:
+            try:
+                name = path.relative_to(self.directory).as_posix()
+            except ValueError:
+                name = None
+            owner = name and self._owner(name)
+            if owner is not None and owner != paper_hash:
+                raise ValueError(f"{name} belongs to paper {owner}, not {paper_hash}")
+        if path.exists():
+            if os.path.samefile(path, target):
+                return 'existing'
+            if preserve:
+                self._keep_unknown(path)
+        tmp_path = path.with_name(f".{path.name}.link")
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(target, tmp_path)
+            mode = 'hardlink'
+        except OSError:
+            try:
+                os.symlink(os.path.relpath(target, path.parent), tmp_path)
+                mode = 'symlink'
+            except OSError:
+                shutil.copyfile(target, tmp_path)
+                mode = 'copy'
+        os.replace(tmp_path, path)
+        return mode
+
+    def _keep_unknown(self, path):
+        """Stores a regular file at path that the index does not know about, before its name is taken."""
+        if path.exists() and not path.is_symlink() and self._registered(path) is None:
+            self._add_object(path, hash_file(path).hexdigest(), keep=True)
+
+    def _registered(self, path):
+        try:
+            name = Path(path).relative_to(self.directory).as_posix()
+        except ValueError:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT sha256 FROM names WHERE name = ?", (name,)).fetchone()
+        return row and row[0]
+
+    def _register(self, name, sha256, paper_hash, title, year):
+        """Records name -> sha256; returns False, changing nothing, if another paper holds name."""
+        with self._lock:
+            if paper_hash is not None and self._reserved.get(name, paper_hash) != paper_hash:
+                return False
+            cursor = self._db.execute(
+                "INSERT INTO names (name, sha256, paper_hash, title, year) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET sha256 = excluded.sha256, "
+                "paper_hash = COALESCE(excluded.paper_hash, names.paper_hash), "
+                "title = COALESCE(excluded.title, names.title), year = COALESCE(excluded.year, names.year) "
+                "WHERE names.paper_hash IS NULL OR excluded.paper_hash IS NULL "
+                "OR names.paper_hash = excluded.paper_hash",
+                (name, sha256, paper_hash, title, year))
+            self._db.commit()
+            return cursor.rowcount == 1
+
+    def put(self, path, name, paper_hash=None, title=None, year=None, sha256=None):
+        """Stores the file at path and links it under name; returns the readable path.
+
+        path is moved into the object store, or deleted if the same content is
+        already there. When path is the readable name itself (adopting a file
+        from before this store existed) it stays in place as a hard link. If
+        another paper holds name, the hash-suffixed name is used instead.
+        """
+        path = Path(path)
+        sha256 = sha256 or hash_file(path).hexdigest()
+        readable = self.directory / name
+        in_place = path.exists() and readable.exists() and os.path.samefile(path, readable)
+        self._add_object(path, sha256, keep=in_place)
+        if not in_place:
+            self._keep_unknown(readable)
+        if not self._register(name, sha256, paper_hash, title, year):
+            for name in self._candidates(name, paper_hash)[1:]:
+                readable = self.directory / name
+                self._keep_unknown(readable)
+                if self._register(name, sha256, paper_hash, title, year):
+                    break
+        self.link(sha256, readable, paper_hash=paper_hash)
+        return readable
+
+    def adopt(self, path, paper_hash, title=None, year=None, expected_sha256=None):
+        """Registers a PDF already saved under its readable name for paper_hash.
+
+        Returns the SHA-256, or None if the file does not match expected_sha256
+        (it was overwritten by another paper with the same title).
+        """
+        sha256 = hash_file(path).hexdigest()
+        if expected_sha256 and sha256 != expected_sha256:
+            return None
+        self.put(path, Path(path).relative_to(self.directory).as_posix(), paper_hash, title, year, sha256)
+        return sha256
+
+    def dedupe(self, directories=()):
+        """Replaces every PDF under directory and directories with a link to its object.
+
+        Files that already share an object's inode are skipped without being
+        hashed, so repeat passes are cheap. Returns counts and the bytes freed.
+        """
+        stats = {'files': 0, 'already_linked': 0, 'linked': 0, 'new_objects': 0, 'bytes_saved': 0}
+        linked_inodes = set()
+        for root, _, filenames in os.walk(self.objects_dir):
+            for filename in filenames:
+                if filename.endswith('.pdf') and Path(root).parent == self.objects_dir:
+                    st = os.stat(os.path.join(root, filename))
+                    linked_inodes.add((st.st_dev, st.st_ino))
+        for directory in (self.directory, *map(Path, directories)):
+            for root, dirnames, filenames in os.walk(directory):
+                dirnames[:] = [d for d in dirnames if d != OBJECTS_DIRNAME]
+                for filename in filenames:
+                    path = Path(root) / filename
+                    if not filename.lower().endswith('.pdf') or path.is_symlink():
+                        continue
+                    stats['files'] += 1
+                    st = path.stat()
+                    if (st.st_dev, st.st_ino) in linked_inodes:
+                        stats['already_linked'] += 1
+                        continue
+                    sha256 = hash_file(path).hexdigest()
+                    new = self._add_object(path, sha256, keep=True)
+                    target = self.object_path(sha256).stat()
+                    linked_inodes.add((target.st_dev, target.st_ino))
+                    stats['new_objects'] += new
+                    if path.parent == self.directory:
+                        self._register(filename, sha256, None, None, None)
+                    if (target.st_dev, target.st_ino) == (st.st_dev, st.st_ino):
+                        continue
+                    mode = self.link(sha256, path, preserve=False)
+                    stats['linked'] += 1
+                    if not new and mode != 'copy':
+                        stats['bytes_saved'] += st.st_size
+        return stats
@@ -0,0 +1,125 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+
+MANIFEST_FILENAME = '.download_manifest.jsonl'
+HASH_BLOCK_SIZE = 1024 * 1024
+
+_CONTENT_RANGE_RE = re.compile(r'bytes\s+\d+-\d+/(\d+)')
+
+
+class StalePartialDownload(Exception):
+    """The server rejected the Range for a .part file (HTTP 416); restart from zero."""
+
+
+def hash_file(path):
+    """Returns a sha256 object fed with the current contents of path."""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            hasher.update(block)
+    return hasher
+
+
+def expected_size(status, headers):
+    """Total size of the resource from a 200 or 206 response, or None if unknown."""
+    if status == 206:
+        match = _CONTENT_RANGE_RE.match(headers.get('Content-Range', ''))
+        return int(match.group(1)) if match else None
+    length = headers.get('Content-Length')
+    return int(length) if length and length.isdigit() else None
+
+
+class DownloadManifest:
+    """Append-only JSONL log of download state, kept next to the PDFs.
+
+    Each line is a full snapshot for one URL; the last line for a URL wins.
+    A file is only treated as done when the manifest says it completed and
+    the size on disk still matches, so truncated files are fetched again and
+    interrupted ``.part`` files are resumed with a Range request.
+    """
+
+    def __init__(self, directory, verify_hash=False):
+        self.path = os.path.join(directory, MANIFEST_FILENAME)
+        self.verify_hash = verify_hash
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        lines = 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn final line from a crash
+                self.entries[entry['url']] = entry
+        if lines > 2 * len(self.entries):
+            self.compact()
+
+    def compact(self):
+        """Rewrites the log with one line per URL."""
+        with self._lock:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in self.entries.values():
+                    f.write(json.dumps(entry) + '\n')
+            os.replace(tmp_path, self.path)
+
+    def get(self, url):
+        return self.entries.get(url)
+
+    def record(self, url, **fields):
+        with self._lock:
+            entry = dict(self.entries.get(url, {'url': url}))
+            entry.update(fields, updated_at=time.time())
+            self.entries[url] = entry
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+        return entry
+
+    def is_complete(self, url, path):
+        entry = self.entries.get(url)
+        if not entry or not entry.get('complete') or not os.path.exists(path):
+            return False
+        if os.path.getsize(path) != entry.get('bytes_written'):
+            return False
+        if self.verify_hash and entry.get('sha256'):
+            return hash_file(path).hexdigest() == entry['sha256']
+        return True
+
+    def resume_headers(self, url, part_path):
+        """Range/If-Range headers for continuing part_path, or {} to start over.
+
+        If-Range makes the server send the full body instead of a range when the
+        file changed since the partial download, so a stale prefix is never kept.
+        """
+        entry = self.entries.get(url)
+        if not entry or not os.path.exists(part_path):
+            return {}
+        offset = os.path.getsize(part_path)
+        validator = entry.get('etag') or entry.get('last_modified')
+        if offset == 0 or not validator:
+            return {}
+        return {'Range': f'bytes={offset}-', 'If-Range': validator}
+
+    def start(self, url, path, status, headers):
+        return self.record(url, path=os.path.basename(path),
+                           expected_size=expected_size(status, headers),
+                           etag=headers.get('ETag'),
+                           last_modified=headers.get('Last-Modified'),
+                           complete=False)
+
+    def progress(self, url, part_path):
+        size = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        return self.record(url, bytes_written=size, complete=False)
+
+    def finish(self, url, bytes_written, sha256):
+        return self.record(url, bytes_written=bytes_written, sha256=sha256, complete=True)
@@ -0,0 +1,115 @@
+"""Chooses which scraped papers to download, in what order, and when to stop.
+
+``DownloadSchedule`` narrows the records by year range, title/author regex
+and keywords (any of them in the title) using only the metadata already in
+hand, so rejected papers cost no requests. It then orders what is left. A
+priority list (paper hashes or exact titles) goes first, followed by the
+rest in scrape order, newest or oldest year first, or smallest PDF first.
+Smallest-first needs sizes from HEAD requests, which
+``ScraperEngine.download_selected`` sends only for papers it would
+actually download.
+
+``DownloadBudget`` caps the bytes and wall-clock time of a download phase.
+It is checked before each download starts. Once it is spent no new downloads
+start, and the ones already in flight finish, so a byte budget can overshoot
+by at most the concurrency times a PDF's size.
+"""
+import re
+import time
+
+ORDERS = ('scrape', 'newest', 'oldest', 'smallest')
+
+
+def load_priority(path):
+    """Paper hashes or titles, one per line; blank lines and '#' comments are ignored."""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+class DownloadSchedule:
+
+    def __init__(self, start_year=None, end_year=None, title_pattern=None, author_pattern=None,
+                 keywords=(), order='scrape', priority=()):
+        if order not in ORDERS:
+            raise ValueError(f"Unknown download order {order!r}; choose from {ORDERS}")
+        self.start_year = start_year
+        self.end_year = end_year
+        self.title_pattern = re.compile(title_pattern, re.IGNORECASE) if title_pattern else None
+        self.author_pattern = re.compile(author_pattern, re.IGNORECASE) if author_pattern else None
+        self.keywords = [keyword.lower() for keyword in keywords]
+        self.order = order
+        # Position in the priority list by hash or lower-cased title.
+        self.priority = {}
+        for rank, key in enumerate(priority):
+            self.priority.setdefault(key.lower(), rank)
+
+    def matches(self, paper):
+        if self.start_year is not None and paper.year < self.start_year:
+            return False
+        if self.end_year is not None and paper.year > self.end_year:
+            return False
+        if self.title_pattern is not None and not self.title_pattern.search(paper.title):
+            return False
+        if self.author_pattern is not None and not self.author_pattern.search(paper.authors):
+            return False
+        if self.keywords:
+            title = paper.title.lower()
+            return any(keyword in title for keyword in self.keywords)
+        return True
+
+    def rank(self, paper):
+        """Priority list position, or None for unlisted papers."""
+        rank = self.priority.get(paper.hash.lower())
+        return rank if rank is not None else self.priority.get(paper.title.lower())
+
+    def select(self, papers, sizes=None):
+        """Matching papers in download order.
+
+        sizes maps paper hash to bytes (None if unknown) for the 'smallest'
+        order; papers of unknown size go after those with a known size.
+        """
+        selected = [paper for paper in papers if self.matches(paper)]
+        # sort is stable, so ties keep scrape order.
+        if self.order == 'newest':
+            selected.sort(key=lambda paper: -paper.year)
+        elif self.order == 'oldest':
+            selected.sort(key=lambda paper: paper.year)
+        elif self.order == 'smallest' and sizes is not None:
+            selected.sort(key=lambda paper: (sizes.get(paper.hash) is None, sizes.get(paper.hash) or 0))
+        if self.priority:
+            def listed_first(paper):
+                rank = self.rank(paper)
+                return (0, rank) if rank is not None else (1, 0)
+            selected.sort(key=listed_first)
+        return selected
+
+
+class DownloadBudget:
+
+    def __init__(self, max_bytes=None, max_seconds=None):
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.bytes = 0          # Downloaded, plus the known sizes of downloads in flight
+        self.deadline = None
+        self.exhausted = None   # 'bytes' or 'time' once the budget has run out
+
+    def start(self):
+        if self.max_seconds is not None:
+            self.deadline = time.monotonic() + self.max_seconds
+
+    def admit(self, size=None):
+        """True if a download of size bytes (None if unknown) may start; reserves the size."""
+        if self.exhausted is None:
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                self.exhausted = 'time'
+            elif self.max_bytes is not None and (self.bytes >= self.max_bytes
+                                                 or self.bytes + (size or 0) > self.max_bytes):
+                self.exhausted = 'bytes'
+        if self.exhausted is not None:
+            return False
+        self.bytes += size or 0
+        return True
+
+    def record(self, reserved, actual):
+        """Replaces a reservation made by admit() with the bytes actually downloaded."""
+        self.bytes += actual - (reserved or 0)
@@ -0,0 +1,63 @@
+"""Hands engine events from worker threads to the Tk thread.
+
+Workers call ``publish`` from any thread; ``collections.deque`` appends and
+pops are atomic, so publishing never takes a lock or touches Tk. The Tk
+thread calls ``drain`` on a fixed tick and gets the backlog coalesced: one
+batch of log lines, one merged stats dict and the latest progress value per
+run of such events, so the widgets are updated once per tick instead of once
+per paper.
+"""
+from collections import deque
+
+COALESCED_KINDS = ('log', 'stats', 'progress')
+
+
+class EventBus:
+    """Many-producer, single-consumer queue of ``(kind, data)`` events."""
+
+    def __init__(self, log_limit=2000):
+        self.events = deque()
+        self.log_limit = log_limit
+
+    def publish(self, kind, data=None):
+        self.events.append((kind, data))
+
+    def drain(self):
+        """Yields the queued events in order, coalesced.
+
+        Each run of log/stats/progress events becomes at most a
+        ``('log', [message, ...])`` keeping the newest ``log_limit`` lines, a
+        ``('stats', merged)`` and a ``('progress', {'percent': latest})``.
+        Any other event is yielded as published, after the updates before it.
+        """
+        lines = deque(maxlen=self.log_limit)
+        dropped = 0
+        stats = {}
+        progress = None
+        # Only what is queued now, so busy producers cannot keep the consumer here.
+        for _ in range(len(self.events)):
+            kind, data = self.events.popleft()
+            if kind == 'log':
+                if len(lines) == lines.maxlen:
+                    dropped += 1
+                lines.append(data['message'])
+            elif kind == 'stats':
+                stats.update(data)
+            elif kind == 'progress':
+                progress = data['percent']
+            else:
+                yield from self._flush(lines, dropped, stats, progress)
+                lines.clear()
+                dropped, stats, progress = 0, {}, None
+                yield kind, data
+        yield from self._flush(lines, dropped, stats, progress)
+
+    @staticmethod
+    def _flush(lines, dropped, stats, progress):
+        if lines:
+            notice = [f"... {dropped} earlier log lines dropped"] if dropped else []
+            yield 'log', notice + list(lines)
+        if stats:
+            yield 'stats', stats
+        if progress is not None:
+            yield 'progress', {'percent': progress}
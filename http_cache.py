@@ -0,0 +1,166 @@
+import re
+import time
+import asyncio
+import zlib
+import sqlite3
+import threading
+
+CACHE_FILENAME = '.http_cache.sqlite'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_YEAR_RE = re.compile(r'/paper(?:_files/paper)?/(\d{4})(?:/|$)')
+
+
+def url_year(url):
+    """Proceedings year encoded in a NeurIPS URL, or None."""
+    match = _YEAR_RE.search(url)
+    return int(match.group(1)) if match else None
+
+
+class HTTPCache:
+    """On-disk cache for proceedings index and abstract pages.
+
+    Bodies are stored zlib-compressed in SQLite, keyed by URL, and revalidated
+    with If-None-Match / If-Modified-Since. Pages for years before
+    ``frozen_before_year`` are served from the cache without touching the
+    network at all, since published proceedings never change. The least
+    recently used entries are evicted once the compressed total exceeds
+    ``max_bytes``.
+    """
+
+    def __init__(self, path=CACHE_FILENAME, max_bytes=DEFAULT_MAX_BYTES, frozen_before_year=None, max_age=0):
+        self.max_bytes = max_bytes
+        self.frozen_before_year = frozen_before_year
+        self.max_age = max_age
+        self.counters = {'hits': 0, 'revalidated': 0, 'misses': 0, 'bytes_saved': 0}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                stored_size INTEGER NOT NULL,
+                raw_size INTEGER NOT NULL,
+                encoding TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def is_frozen(self, url):
+        year = url_year(url)
+        return self.frozen_before_year is not None and year is not None and year < self.frozen_before_year
+
+    def lookup(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, raw_size, encoding, etag, last_modified, fetched_at FROM responses WHERE url = ?",
+                (url,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+        body, raw_size, encoding, etag, last_modified, fetched_at = row
+        return {'body': body, 'raw_size': raw_size, 'encoding': encoding, 'etag': etag,
+                'last_modified': last_modified, 'fetched_at': fetched_at}
+
+    def is_fresh(self, url, entry):
+        return self.is_frozen(url) or time.time() - entry['fetched_at'] < self.max_age
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry is None:
+            return headers
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    @staticmethod
+    def decode(entry):
+        return zlib.decompress(entry['body']).decode(entry['encoding'] or 'utf-8', errors='replace')
+
+    def store(self, url, content, encoding, headers):
+        body = zlib.compress(content)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, body, len(body), len(content), encoding, headers.get('ETag'),
+                 headers.get('Last-Modified'), now, now))
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(stored_size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT url, stored_size FROM responses ORDER BY last_access")
+        doomed = []
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((url,))
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE url = ?", doomed)
+
+    def _revalidated(self, url, entry):
+        with self._lock:
+            self._db.execute("UPDATE responses SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+        self._count('revalidated', entry['raw_size'])
+
+    def _count(self, counter, saved=0):
+        with self._lock:
+            self.counters[counter] += 1
+            self.counters['bytes_saved'] += saved
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(stored_size), 0) FROM responses").fetchone()
+            return dict(self.counters, entries=entries, stored_bytes=size)
+
+    def get_text(self, session, url, **kwargs):
+        """Cached GET through a requests.Session; raises requests.HTTPError like raise_for_status."""
+        entry = self.lookup(url)
+        if entry and self.is_fresh(url, entry):
+            self._count('hits', entry['raw_size'])
+            return self.decode(entry)
+        headers = dict(kwargs.pop('headers', None) or {}, **self.conditional_headers(entry))
+        response = session.get(url, headers=headers, **kwargs)
+        if response.status_code == 304 and entry:
+            self._revalidated(url, entry)
+            return self.decode(entry)
+        response.raise_for_status()
+        self._count('misses')
+        self.store(url, response.content, response.encoding or response.apparent_encoding, response.headers)
+        return response.text
+
+    async def get_text_async(self, session, url, **kwargs):
+        """Cached GET through an aiohttp.ClientSession; raises aiohttp.ClientResponseError on HTTP errors."""
+        entry = self.lookup(url)
+        if entry and self.is_fresh(url, entry):
+            self._count('hits', entry['raw_size'])
+            return self.decode(entry)
+        headers = dict(kwargs.pop('headers', None) or {}, **self.conditional_headers(entry))
+        async with session.get(url, headers=headers, **kwargs) as response:
+            if response.status == 304 and entry:
+                self._revalidated(url, entry)
+                return self.decode(entry)
+            response.raise_for_status()
+            content = await response.read()
+            encoding = response.get_encoding()
+        self._count('misses')
+        # Compressing a large index page is enough to stall the event loop.
+        await asyncio.to_thread(self.store, url, content, encoding, response.headers)
+        return content.decode(encoding, errors='replace')
@@ -0,0 +1,297 @@
+"""Paper metadata storage behind one interface.
+
+``SQLiteMetadataStore`` is the default: one row per paper keyed on the paper
+hash, with indexes on year and title so loading or querying a single year
+never reads the rest. ``ParquetMetadataStore`` keeps the same records in a
+Parquet file sorted by year, so readers can skip whole row groups; it is only
+available when pyarrow is installed. Records are ``Paper`` instances rather
+than dicts, and CSV is kept as an import/export format.
+"""
+import os
+import csv
+import sqlite3
+import threading
+import importlib.util
+from dataclasses import dataclass, fields
+
+from parsers import derive_pdf_href
+from scrape_state import paper_hash
+
+# pyarrow is optional and slow to import, so it is only loaded once a Parquet store is opened.
+HAVE_PYARROW = importlib.util.find_spec('pyarrow') is not None
+pa = pc = ds = pq = None
+
+STORE_FILENAME = 'papers_metadata.sqlite'
+BATCH_SIZE = 1000
+LINKS_REPAIRED_VERSION = 1  # SQLite user_version once repair_links has run
+
+
+def paper_hash_from_link(pdf_link):
+    """The paper hash in a proceedings PDF URL (``.../file/<hash>-Paper.pdf``)."""
+    return pdf_link.rsplit('/', 1)[-1].split('-Paper', 1)[0]
+
+
+def repair_pdf_link(pdf_link):
+    """Fixes the '.../file/<hash>-Abstract-<Track>.html-Paper.pdf' links older scrapers built.
+
+    They pasted the whole abstract file name in front of '-Paper.pdf' for
+    track-suffixed papers (2022 on); the real PDF is '<hash>-Paper-<Track>.pdf'.
+    Other links are returned unchanged.
+    """
+    base, _, name = pdf_link.rpartition('/file/')
+    if not base or '-Abstract' not in name or not name.endswith('-Paper.pdf'):
+        return pdf_link
+    return derive_pdf_href(f"{base}/hash/{name[:-len('-Paper.pdf')]}") or pdf_link
+
+
+@dataclass(slots=True)
+class Paper:
+    title: str
+    authors: str
+    year: int
+    pdf_link: str
+    hash: str
+
+    @classmethod
+    def from_record(cls, record):
+        """Builds a Paper from a parser record or CSV row; old CSVs have no hash column.
+
+        Broken track-suffixed links and '<hash>-Abstract-<Track>.html' hashes
+        from older scrapers are repaired on the way in.
+        """
+        pdf_link = repair_pdf_link(record['pdf_link'])
+        h = paper_hash(record.get('hash') or paper_hash_from_link(pdf_link))
+        return cls(record['title'], record.get('authors') or '', int(record['year']), pdf_link, h)
+
+    def row(self):
+        """Field values in FIELDS order (dataclasses.astuple deep-copies and is far slower)."""
+        return self.title, self.authors, self.year, self.pdf_link, self.hash
+
+
+FIELDS = tuple(field.name for field in fields(Paper))
+
+
+class MetadataStore:
+    """Interface shared by the store backends.
+
+    ``upsert`` inserts or replaces papers by hash and returns how many were
+    new; ``iter_papers`` streams papers, optionally limited to a year range,
+    without loading the whole store.
+    """
+
+    def upsert(self, papers):
+        raise NotImplementedError
+
+    def delete(self, hashes):
+        raise NotImplementedError
+
+    def iter_papers(self, start_year=None, end_year=None):
+        raise NotImplementedError
+
+    def count(self, start_year=None, end_year=None):
+        return sum(1 for _ in self.iter_papers(start_year, end_year))
+
+    def years(self):
+        return sorted({paper.year for paper in self.iter_papers()})
+
+    def close(self):
+        pass
+
+    def repair_links(self):
+        """Rekeys papers stored under the broken hashes of older scrapers; returns how many.
+
+        Such rows carry '-Abstract' in their hash and a PDF link that does not
+        exist, so they fail every download and duplicate the correct row.
+        """
+        broken = [paper for paper in self.iter_papers() if '-Abstract' in paper.hash]
+        if broken:
+            self.delete([paper.hash for paper in broken])
+            self.upsert(Paper.from_record(dict(zip(FIELDS, paper.row()))) for paper in broken)
+        return len(broken)
+
+    def import_csv(self, path):
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            return self.upsert(Paper.from_record(row) for row in csv.DictReader(f))
+
+    def export_csv(self, path, start_year=None, end_year=None):
+        """Writes the papers to a CSV, atomically; returns the number of rows."""
+        rows = 0
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            for paper in self.iter_papers(start_year, end_year):
+                writer.writerow(paper.row())
+                rows += 1
+        os.replace(tmp_path, path)
+        return rows
+
+
+class SQLiteMetadataStore(MetadataStore):
+
+    def __init__(self, path=STORE_FILENAME):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS papers (
+                hash TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                authors TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                pdf_link TEXT NOT NULL
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS papers_year ON papers (year, title)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS papers_title ON papers (title)")
+        self._db.commit()
+
+    def repair_links(self):
+        """As MetadataStore.repair_links, but only once per store file."""
+        with self._lock:
+            version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version >= LINKS_REPAIRED_VERSION:
+            return 0
+        repaired = super().repair_links()
+        with self._lock:
+            self._db.execute(f"PRAGMA user_version = {LINKS_REPAIRED_VERSION}")
+            self._db.commit()
+        return repaired
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _year_clause(start_year, end_year):
+        return ("WHERE year BETWEEN ? AND ?",
+                (start_year if start_year is not None else -1, end_year if end_year is not None else 9999))
+
+    def upsert(self, papers):
+        with self._lock:
+            before = self._db.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+            self._db.executemany(
+                "INSERT INTO papers (hash, title, authors, year, pdf_link) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (hash) DO UPDATE SET title = excluded.title, authors = excluded.authors, "
+                "year = excluded.year, pdf_link = excluded.pdf_link",
+                ((p.hash, p.title, p.authors, p.year, p.pdf_link) for p in papers))
+            self._db.commit()
+            return self._db.execute("SELECT COUNT(*) FROM papers").fetchone()[0] - before
+
+    def delete(self, hashes):
+        with self._lock:
+            self._db.executemany("DELETE FROM papers WHERE hash = ?", ((h,) for h in hashes))
+            self._db.commit()
+
+    def iter_papers(self, start_year=None, end_year=None):
+        where, params = self._year_clause(start_year, end_year)
+        with self._lock:
+            cursor = self._db.execute(
+                f"SELECT title, authors, year, pdf_link, hash FROM papers {where} ORDER BY year, title", params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                return
+            for row in rows:
+                yield Paper(*row)
+
+    def count(self, start_year=None, end_year=None):
+        where, params = self._year_clause(start_year, end_year)
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM papers {where}", params).fetchone()[0]
+
+    def years(self):
+        with self._lock:
+            return [year for (year,) in self._db.execute("SELECT DISTINCT year FROM papers ORDER BY year")]
+
+
+class ParquetMetadataStore(MetadataStore):
+    """Parquet file rewritten on each upsert, one row group per year."""
+
+    def __init__(self, path):
+        global pa, pc, ds, pq
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+        self.path = path
+        self.schema = pa.schema([('title', pa.string()), ('authors', pa.string()), ('year', pa.int32()),
+                                 ('pdf_link', pa.string()), ('hash', pa.string())])
+        self._lock = threading.Lock()
+
+    def _table(self):
+        if not os.path.exists(self.path):
+            return self.schema.empty_table()
+        return pq.read_table(self.path, schema=self.schema)
+
+    def upsert(self, papers):
+        columns = {name: [] for name in FIELDS}
+        for paper in papers:
+            for name, value in zip(FIELDS, paper.row()):
+                columns[name].append(value)
+        incoming = pa.table(columns, schema=self.schema)
+        with self._lock:
+            table = self._table()
+            kept = table.filter(pc.invert(pc.is_in(table['hash'], value_set=incoming['hash'])))
+            # Deduplicate within the batch too: the last record for a hash wins, as in SQLite.
+            last = {paper_hash: i for i, paper_hash in enumerate(incoming['hash'].to_pylist())}
+            incoming = incoming.take(sorted(last.values()))
+            merged = pa.concat_tables([kept, incoming]).sort_by([('year', 'ascending'), ('title', 'ascending')])
+            self._write(merged)
+            return merged.num_rows - table.num_rows
+
+    def delete(self, hashes):
+        with self._lock:
+            table = self._table()
+            self._write(table.filter(pc.invert(pc.is_in(table['hash'], value_set=pa.array(list(hashes), pa.string())))))
+
+    def _write(self, table):
+        tmp_path = f"{self.path}.tmp"
+        with pq.ParquetWriter(tmp_path, self.schema) as writer:
+            for year in table['year'].unique().to_pylist():
+                writer.write_table(table.filter(pc.equal(table['year'], year)))
+        os.replace(tmp_path, self.path)
+
+    def repair_links(self):
+        # Reads just the hash column to decide; a rewrite is only needed for old files.
+        if not os.path.exists(self.path):
+            return 0
+        hashes = pq.read_table(self.path, columns=['hash'])['hash']
+        if not pc.any(pc.match_substring(hashes, '-Abstract')).as_py():
+            return 0
+        return super().repair_links()
+
+    def iter_papers(self, start_year=None, end_year=None):
+        if not os.path.exists(self.path):
+            return
+        condition = None
+        if start_year is not None:
+            condition = ds.field('year') >= start_year
+        if end_year is not None:
+            upper = ds.field('year') <= end_year
+            condition = upper if condition is None else condition & upper
+        dataset = ds.dataset(self.path, format='parquet', schema=self.schema)
+        for batch in dataset.to_batches(columns=list(FIELDS), filter=condition, batch_size=BATCH_SIZE):
+            for row in zip(*(column.to_pylist() for column in batch.columns)):
+                yield Paper(*row)
+
+    def count(self, start_year=None, end_year=None):
+        if not os.path.exists(self.path):
+            return 0
+        if start_year is None and end_year is None:
+            return pq.ParquetFile(self.path).metadata.num_rows
+        return super().count(start_year, end_year)
+
+    def years(self):
+        if not os.path.exists(self.path):
+            return []
+        return sorted(pq.read_table(self.path, columns=['year'])['year'].unique().to_pylist())
+
+
+def open_store(path=STORE_FILENAME):
+    """Opens the store at path; a '.parquet' suffix selects the Parquet backend."""
+    if str(path).endswith('.parquet'):
+        if not HAVE_PYARROW:
+            raise ValueError(f"Parquet metadata store {path!r} needs pyarrow, which is not installed")
+        return ParquetMetadataStore(path)
+    return SQLiteMetadataStore(path)
@@ -0,0 +1,285 @@
+"""Per-stage timing histograms and counters for the crawlers.
+
+A ``Metrics`` registry keeps one latency histogram per (stage, host) and
+labelled counters, and exports them as Prometheus text (to a file or a small
+HTTP endpoint) or as a JSON summary with estimated percentiles. Stages used
+by the scrapers:
+
+* ``dns``, ``connect`` - name resolution and TCP/TLS setup (aiohttp only)
+* ``ttfb`` - request sent until response headers arrived
+* ``fetch`` - a whole page fetch through the HTTP cache
+* ``parse`` - turning a page into records
+* ``transfer``, ``write`` - receiving a PDF body, and the part of that spent writing to disk
+* ``download`` - one PDF from asking the rate limiter for a slot to the stored file
+
+When disabled every call returns immediately and ``timer()`` hands back a
+shared no-op context manager, so instrumented code costs well under a
+microsecond per call. ``profile()`` wraps a run in cProfile or, when
+installed, yappi (which also sees worker threads).
+"""
+import os
+import json
+import time
+import bisect
+import threading
+import contextlib
+import importlib.util
+from urllib.parse import urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds, covering a cached page (milliseconds) to a slow PDF (a minute).
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+NAMESPACE = 'neurips'
+_NULL_TIMER = contextlib.nullcontext()
+
+
+def url_host(url):
+    return urlsplit(str(url)).netloc
+
+
+class Histogram:
+    """Cumulative-style histogram over BUCKETS, plus sum and count."""
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate by linear interpolation inside the bucket holding the q-th value."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return BUCKETS[-1]
+
+
+class _Timer:
+    __slots__ = ('metrics', 'stage', 'host', 'started')
+
+    def __init__(self, metrics, stage, host):
+        self.metrics, self.stage, self.host = metrics, stage, host
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, self.host, time.perf_counter() - self.started)
+        if exc_type is not None:
+            self.metrics.inc('stage_errors', self.host, stage=self.stage)
+
+
+class Metrics:
+    """Thread-safe registry of stage histograms and counters."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.started = time.time()
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, host, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get((stage, host))
+            if histogram is None:
+                histogram = self.histograms[(stage, host)] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, host=None, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, host, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def timer(self, stage, host=None):
+        """``with metrics.timer('parse', host):`` records the block's duration."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage, host)
+
+    def requests_hook(self, response, *args, **kwargs):
+        """``requests`` response hook: time to headers and status per host."""
+        host = url_host(response.url)
+        self.observe('ttfb', host, response.elapsed.total_seconds())
+        self.inc('http_responses', host, status=response.status_code)
+
+    def trace_configs(self):
+        """aiohttp TraceConfigs for DNS, connect and TTFB timing; [] when disabled."""
+        if not self.enabled:
+            return []
+        import aiohttp
+
+        async def on_request_start(session, context, params):
+            context.host = url_host(params.url)
+            context.started = time.perf_counter()
+            context.connect_started = context.dns_started = None
+
+        async def on_connection_create_start(session, context, params):
+            context.connect_started = time.perf_counter()
+
+        async def on_connection_create_end(session, context, params):
+            self.observe('connect', context.host, time.perf_counter() - context.connect_started)
+
+        async def on_dns_resolvehost_start(session, context, params):
+            context.dns_started = time.perf_counter()
+
+        async def on_dns_resolvehost_end(session, context, params):
+            self.observe('dns', context.host, time.perf_counter() - context.dns_started)
+
+        async def on_request_end(session, context, params):
+            self.observe('ttfb', context.host, time.perf_counter() - context.started)
+            self.inc('http_responses', context.host, status=params.response.status)
+
+        async def on_request_exception(session, context, params):
+            self.inc('http_errors', context.host, error=type(params.exception).__name__)
+
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_create_start.append(on_connection_create_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+        trace.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+        trace.on_request_end.append(on_request_end)
+        trace.on_request_exception.append(on_request_exception)
+        return [trace]
+
+    @staticmethod
+    def _labels(**labels):
+        pairs = ','.join(f'{key}="{str(value).replace(chr(34), chr(39))}"'
+                         for key, value in labels.items() if value is not None)
+        return '{' + pairs + '}' if pairs else ''
+
+    def prometheus_text(self):
+        """Current values in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = sorted(self.histograms.items(), key=lambda item: (item[0][0], item[0][1] or ''))
+            counters = sorted(self.counters.items(), key=lambda item: (item[0][0], item[0][1] or '', item[0][2]))
+            lines = [f"# HELP {NAMESPACE}_stage_seconds Time spent per crawl stage.",
+                     f"# TYPE {NAMESPACE}_stage_seconds histogram"]
+            for (stage, host), histogram in histograms:
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS + ('+Inf',), histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f"{NAMESPACE}_stage_seconds_bucket"
+                                 f"{self._labels(stage=stage, host=host, le=bound)} {cumulative}")
+                lines.append(f"{NAMESPACE}_stage_seconds_sum{self._labels(stage=stage, host=host)} {histogram.sum}")
+                lines.append(f"{NAMESPACE}_stage_seconds_count{self._labels(stage=stage, host=host)} {histogram.count}")
+            declared = set()
+            for (name, host, labels), value in counters:
+                if name not in declared:
+                    declared.add(name)
+                    lines.append(f"# TYPE {NAMESPACE}_{name}_total counter")
+                lines.append(f"{NAMESPACE}_{name}_total{self._labels(host=host, **dict(labels))} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """JSON-friendly per-stage and per-host totals with estimated p50/p90/p99."""
+        with self._lock:
+            stages = {}
+            for (stage, host), histogram in sorted(self.histograms.items(), key=lambda item: str(item[0])):
+                stages.setdefault(stage, {})[host or '-'] = {
+                    'count': histogram.count,
+                    'total_seconds': round(histogram.sum, 6),
+                    'mean': round(histogram.sum / histogram.count, 6),
+                    **{f"p{int(q * 100)}": round(histogram.quantile(q), 6) for q in (0.5, 0.9, 0.99)},
+                }
+            counters = {}
+            for (name, host, labels), value in sorted(self.counters.items(), key=lambda item: str(item[0])):
+                key = ','.join([host or '-'] + [f"{k}={v}" for k, v in labels])
+                counters.setdefault(name, {})[key] = value
+        return {'started': self.started, 'elapsed_seconds': round(time.time() - self.started, 3),
+                'stages': stages, 'counters': counters}
+
+    def write_prometheus(self, path):
+        """Writes the text format atomically, e.g. for node_exporter's textfile collector."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def write_json(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serves /metrics from a daemon thread; returns the server (call shutdown() to stop)."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        return server
+
+
+@contextlib.contextmanager
+def cprofile_run(path):
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+@contextlib.contextmanager
+def yappi_run(path):
+    import yappi
+    yappi.set_clock_type('wall')
+    yappi.start()
+    try:
+        yield
+    finally:
+        yappi.stop()
+        yappi.get_func_stats().save(path, type='pstat')
+        yappi.clear_stats()
+
+
+PROFILERS = {'cprofile': cprofile_run}
+if importlib.util.find_spec('yappi') is not None:
+    PROFILERS['yappi'] = yappi_run
+
+
+def profile(path, profiler='cprofile'):
+    """Context manager that profiles the block into a pstats file at path (view with snakeviz or pstats)."""
+    if path is None:
+        return _NULL_TIMER
+    try:
+        return PROFILERS[profiler](path)
+    except KeyError:
+        raise ValueError(f"Unknown or unavailable profiler {profiler!r}; available: {sorted(PROFILERS)}") from None
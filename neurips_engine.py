@@ -0,0 +1,816 @@
+"""Headless NeurIPS scraping and download engine.
+
+This is the async core the Tk window drives, usable on its own from scripts,
+cron jobs and containers; it never imports tkinter or PIL. Progress is
+reported through a single ``on_event(kind, data)`` callback:
+
+* ``('log', {'message': str})``
+* ``('stats', {'total_papers'|'downloaded'|'failed_download'|'skipped': int, ...})``
+* ``('progress', {'percent': float})``
+
+Phases should run through ``engine.run(coro)`` rather than ``asyncio.run`` so
+they share one event loop and one pooled client session.
+
+Command line::
+
+    python neurips_engine.py scrape --start 2018 --end 2024
+    python neurips_engine.py download --dir Scrapped_PDFs
+    python neurips_engine.py run --start 2023 --end 2024 --dir Scrapped_PDFs
+    python neurips_engine.py download --start 2024 --keywords diffusion transformer --order smallest --max-mb 500
+    python neurips_engine.py dedupe --dir Scrapped_PDFs /mnt/old_mirror
+    python neurips_engine.py coordinate --queue /shared/crawl_queue.sqlite --start 2010 --end 2024
+    python neurips_engine.py work --queue /shared/crawl_queue.sqlite --dir Scrapped_PDFs   # on each node
+    python neurips_engine.py --metrics-json metrics.json --profile run.pstats run --start 2024 --end 2024
+"""
+import os
+import re
+import ssl
+import time
+import random
+import socket
+import asyncio
+import hashlib
+import argparse
+import itertools
+import threading
+import concurrent.futures
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import aiofiles
+import aiohttp
+
+try:
+    import certifi  # Installed with requests; same CA bundle as Scrapper.py
+except ImportError:
+    certifi = None
+
+import parsers
+from content_store import ContentStore
+from download_scheduler import ORDERS, DownloadBudget, DownloadSchedule, load_priority
+from download_manifest import DownloadManifest, StalePartialDownload, hash_file
+from http_cache import HTTPCache
+from scrape_state import ScrapeState
+from metadata_store import Paper, open_store
+from metrics import Metrics, PROFILERS, profile, url_host
+from search_index import INDEX_FILENAME, SearchIndex
+from rate_limiter import RateLimiter, RateLimitedSession
+from work_queue import QUEUE_FILENAME, Lease, WorkQueue, open_queue, shard_of
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14.5; rv:125.0) Gecko/20100101 Firefox/125.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15",
+]
+
+
+class ScraperEngine:
+
+    METADATA_STORE_FILE = 'papers_metadata.sqlite' # A '.parquet' path selects the Parquet backend
+    CSV_OUTPUT_FILE = 'pdf_metadata_output.csv'
+    EXPORT_CSV = True              # Also rewrite CSV_OUTPUT_FILE from the store after each scrape
+    MAX_CONCURRENT_DOWNLOADS = 16  # Download workers pulling from the shared queue
+    CONNECTION_LIMIT = 32          # Total sockets held by the TCPConnector
+    CONNECTION_LIMIT_PER_HOST = 16 # Sockets per host (papers.nips.cc / proceedings.neurips.cc)
+    DOWNLOAD_CHUNK_SIZE = 64 * 1024 # Bytes buffered per in-flight download
+    KEEPALIVE_TIMEOUT = 60         # Seconds an idle pooled connection waits for the next request or phase
+    DNS_CACHE_TTL = 300            # Seconds a resolved address is reused
+    VERIFY_TLS = True              # Check server certificates; connections are reused, so handshakes are rare
+    RATE_LIMIT = 10.0              # Initial requests/s per host; adapts to how the host responds
+    INITIAL_HOST_CONCURRENCY = 4   # Grows up to CONNECTION_LIMIT_PER_HOST while the host stays healthy
+    HTTP_CACHE_FILE = '.http_cache.sqlite'
+    HTTP_CACHE_MAX_BYTES = 256 * 1024 * 1024
+    FROZEN_BEFORE_YEAR = 2024      # Proceedings older than this are served from cache only
+    SCRAPE_STATE_SUFFIX = '.scrape_state.json' # Appended to the store path: each store has its own state
+    PARSER_BACKEND = None          # None picks the fastest installed backend, see parsers.py
+    PARSE_PROCESSES = max(1, (os.cpu_count() or 2) - 1) # Year index parser processes; 0 parses on the event loop
+    INDEX_PROCESSES = PARSE_PROCESSES # PDF text extraction processes for the search index
+    PDF_EXTRACTOR = None           # None picks the fastest installed extractor, see search_index.py
+    COLLECT_METRICS = False        # Per-host stage histograms, see metrics.py; near-free when off
+    DOWNLOAD_SHARDS = 16           # Download tasks per year in a distributed crawl, split by paper hash
+    LEASE_SECONDS = 120            # A worker that stops heartbeating loses its task after this long
+    MAX_TASK_ATTEMPTS = 3          # Claims of a distributed task before it is given up
+    QUEUE_POLL_INTERVAL = 2.0      # Seconds between work queue polls when there is nothing to do
+
+    def __init__(self, download_dir='Scrapped_PDFs', csv_path=None, store_path=None, incremental=True,
+                 on_event: Optional[Callable[[str, Dict], None]] = None):
+        self.download_dir = Path(download_dir)
+        self.csv_path = Path(csv_path or self.CSV_OUTPUT_FILE)
+        store_path = store_path or self.METADATA_STORE_FILE
+        self.store = open_store(store_path)
+        if self.store.count() == 0 and self.csv_path.exists():
+            # One-off migration from the CSV that used to be the only metadata file.
+            self.store.import_csv(self.csv_path)
+        self.incremental = incremental
+        self.on_event = on_event
+        repaired = self.store.repair_links()
+        if repaired:
+            self.log(f"Repaired {repaired} papers stored under broken track-suffixed hashes.")
+        self.http_cache = None
+        self.manifest = None
+        self.content = None
+        self.loop = None
+        self._loop_lock = threading.Lock()
+        self.client = None
+        self.client_loop = None
+        self._ssl_context = None
+        self.connection_stats = {'opened': 0, 'reused': 0}
+        self.scrape_state = ScrapeState(f"{store_path}{self.SCRAPE_STATE_SUFFIX}")
+        self.parse_executor = None
+        self.stage_timings = {}
+        self.metrics = Metrics(enabled=self.COLLECT_METRICS)
+        self.rate_limiter = RateLimiter(rate=self.RATE_LIMIT, concurrency=self.INITIAL_HOST_CONCURRENCY,
+                                        max_concurrency=self.CONNECTION_LIMIT_PER_HOST)
+
+    def emit(self, kind: str, **data):
+        if self.on_event is not None:
+            self.on_event(kind, data)
+
+    def log(self, message: str):
+        self.emit('log', message=message)
+
+    @staticmethod
+    def year_urls(year: int):
+        """(index URL, PDF base URL) for a proceedings year."""
+        if year < 2019:
+            return f"https://papers.nips.cc/paper/{year}", f"https://papers.nips.cc/paper_files/paper/{year}/file"
+        return f"https://proceedings.neurips.cc/paper/{year}", f"https://proceedings.neurips.cc/paper/{year}/file"
+
+    def ssl_context(self) -> ssl.SSLContext:
+        """Built once: loading the CA bundle costs more than a handshake."""
+        if self._ssl_context is None:
+            cafile = certifi.where() if certifi is not None else None
+            self._ssl_context = ssl.create_default_context(cafile=cafile)
+            if not self.VERIFY_TLS:
+                self._ssl_context.check_hostname = False
+                self._ssl_context.verify_mode = ssl.CERT_NONE
+        return self._ssl_context
+
+    def connector(self) -> aiohttp.TCPConnector:
+        return aiohttp.TCPConnector(ssl=self.ssl_context(), limit=self.CONNECTION_LIMIT,
+                                    limit_per_host=self.CONNECTION_LIMIT_PER_HOST,
+                                    keepalive_timeout=self.KEEPALIVE_TIMEOUT, ttl_dns_cache=self.DNS_CACHE_TTL)
+
+    def connection_trace(self) -> aiohttp.TraceConfig:
+        async def on_opened(session, context, params):
+            self.connection_stats['opened'] += 1
+
+        async def on_reused(session, context, params):
+            self.connection_stats['reused'] += 1
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(on_opened)
+        trace.on_connection_reuseconn.append(on_reused)
+        return trace
+
+    def connection_report(self, before: Dict[str, int]) -> str:
+        opened = self.connection_stats['opened'] - before['opened']
+        reused = self.connection_stats['reused'] - before['reused']
+        ratio = reused / (opened + reused) if opened + reused else 0.0
+        return f"{opened} opened, {reused} reused ({ratio:.0%} of requests on a warm connection)"
+
+    async def http_session(self) -> aiohttp.ClientSession:
+        """The engine's client session, shared by scraping and downloading.
+
+        Created on first use in the running loop and kept open, so the pooled
+        keep-alive connections and cached DNS answers carry over between phases
+        as long as they run on the same loop (see ``run``).
+        """
+        loop = asyncio.get_running_loop()
+        if self.client is None or self.client.closed or self.client_loop is not loop:
+            self.client = aiohttp.ClientSession(connector=self.connector(),
+                                                timeout=aiohttp.ClientTimeout(total=None),
+                                                trace_configs=[self.connection_trace(), *self.metrics.trace_configs()])
+            self.client_loop = loop
+        return self.client
+
+    def run(self, coro):
+        """Runs coro to completion on the engine's event loop, which stays open between calls.
+
+        Use this instead of asyncio.run for each phase, so the download phase
+        starts on the connections the scrape left open. Calls from different
+        threads are serialized.
+        """
+        with self._loop_lock:
+            if self.loop is None or self.loop.is_closed():
+                self.loop = asyncio.new_event_loop()
+            return self.loop.run_until_complete(coro)
+
+    def close(self):
+        """Closes the client session and the event loop, unless a run is still in progress."""
+        if not self._loop_lock.acquire(blocking=False):
+            return  # e.g. the window was closed mid-download; the process exit cleans up
+        try:
+            if self.loop is not None and not self.loop.is_closed():
+                if self.client is not None and self.client_loop is self.loop:
+                    self.loop.run_until_complete(self.client.close())
+                self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+                self.loop.run_until_complete(self.loop.shutdown_default_executor())
+                self.loop.close()
+            self.loop = self.client = self.client_loop = None
+        finally:
+            self._loop_lock.release()
+
+    async def download_pdf(self, session: RateLimitedSession, pdf_url: str, destination_path: str) -> bool:
+        tmp_path = f"{destination_path}.part"
+        host = url_host(pdf_url)
+        started = time.perf_counter()
+        headers = {'User-Agent': random.choice(USER_AGENTS)}
+        headers.update(self.manifest.resume_headers(pdf_url, tmp_path))
+
+        try:
+            async with session.get(pdf_url, headers=headers, timeout=60) as response:
+                if response.status == 416:
+                    # The partial file no longer lines up with the server copy; start over
+                    # once this response has been released.
+                    os.remove(tmp_path)
+                    self.manifest.progress(pdf_url, tmp_path)
+                    raise StalePartialDownload(pdf_url)
+                if response.status not in (200, 206):
+                    self.log(f"Failed to download {pdf_url}: HTTP {response.status}")
+                    return False
+
+                # Stream into a sibling .part file so memory per download is bounded by the
+                # chunk size; the .part file is kept on failure so the next run can resume it.
+                resumed = response.status == 206
+                hasher = await asyncio.to_thread(hash_file, tmp_path) if resumed else hashlib.sha256()
+                self.manifest.start(pdf_url, destination_path, response.status, response.headers)
+                transfer_started = time.perf_counter()
+                write_time = 0.0
+                try:
+                    async with aiofiles.open(tmp_path, 'ab' if resumed else 'wb') as f:
+                        async for chunk in response.content.iter_chunked(self.DOWNLOAD_CHUNK_SIZE):
+                            write_started = time.perf_counter()
+                            await f.write(chunk)
+                            write_time += time.perf_counter() - write_started
+                            hasher.update(chunk)
+                finally:
+                    entry = self.manifest.progress(pdf_url, tmp_path)
+                    self.metrics.observe('transfer', host, time.perf_counter() - transfer_started)
+                    self.metrics.observe('write', host, write_time)
+                if entry['expected_size'] is not None and entry['bytes_written'] != entry['expected_size']:
+                    self.log(f"Incomplete download of {pdf_url} "
+                             f"({entry['bytes_written']}/{entry['expected_size']} bytes), will resume next run")
+                    return False
+                os.replace(tmp_path, destination_path)
+                self.manifest.finish(pdf_url, entry['bytes_written'], hasher.hexdigest())
+                self.metrics.observe('download', host, time.perf_counter() - started)
+                self.metrics.inc('pdf_bytes', host, entry['bytes_written'])
+                return True
+        except StalePartialDownload:
+            return await self.download_pdf(session, pdf_url, destination_path)
+        except asyncio.TimeoutError:
+            self.log(f"Download timed out: {pdf_url}")
+            return False
+        except Exception as e:
+            self.log(f"Error downloading {pdf_url}: {str(e)}")
+            return False
+
+    async def scrape_year(self, session: RateLimitedSession, year: int, raise_errors: bool = False) -> List[Paper]:
+        """Papers for one year; failures are logged and give [] unless raise_errors is set."""
+        base_url, pdf_base = self.year_urls(year)
+        headers = {'User-Agent': random.choice(USER_AGENTS)}
+        papers = []
+        try:
+            started = time.perf_counter()
+            html = await self.http_cache.get_text_async(session, base_url, headers=headers, timeout=60)
+            if self.incremental and self.store.count(year, year) == 0:
+                # The state says what was stored; if the rows are gone, so is what it knew.
+                self.scrape_state.forget(year)
+            if self.incremental and not self.scrape_state.page_changed(year, html):
+                self.log(f"Year {year}: index unchanged since last scrape, skipping.")
+                return papers
+            fetched = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            if self.parse_executor is None:
+                records = parsers.year_papers(html, year, pdf_base, self.PARSER_BACKEND)
+            else:
+                records = await loop.run_in_executor(self.parse_executor, parsers.year_papers,
+                                                    html, year, pdf_base, self.PARSER_BACKEND)
+            self.stage_timings['fetch'] += fetched - started
+            self.stage_timings['parse'] += time.perf_counter() - fetched
+            self.metrics.observe('fetch', url_host(base_url), fetched - started)
+            self.metrics.observe('parse', url_host(base_url), time.perf_counter() - fetched)
+            hashes = [record['hash'] for record in records]
+            if self.incremental:
+                new_hashes = set(self.scrape_state.new_paper_hashes(year, hashes))
+                records = [record for record in records if record['hash'] in new_hashes]
+            papers = [Paper.from_record(record) for record in records]
+            self.scrape_state.update(year, html, hashes)
+            # Done means stored here; scrape_range saves the state only after the store.
+            self.scrape_state.mark_done(year, hashes)
+            self.log(f"Year {year}: {len(papers)} {'new ' if self.incremental else ''}papers saved in metadata.")
+        except aiohttp.ClientResponseError as e:
+            self.log(f"Failed to fetch year {year}: HTTP {e.status}")
+            if raise_errors:
+                raise
+        except asyncio.TimeoutError:
+            self.log(f"Scraping year {year} timed out.")
+            if raise_errors:
+                raise
+        except Exception as e:
+            self.log(f"Error scraping year {year}: {str(e)}")
+            if raise_errors:
+                raise
+        return papers
+
+    async def scrape_range(self, start_year: int, end_year: int) -> List[Paper]:
+        """Scrapes every year in [start_year, end_year] concurrently and upserts them into the store."""
+        all_papers = await self.fetch_papers(start_year, end_year)
+        self.save_papers(all_papers)
+        self.scrape_state.save()
+        return all_papers
+
+    async def fetch_papers(self, start_year: int, end_year: int, raise_errors: bool = False) -> List[Paper]:
+        """Scrapes every year in [start_year, end_year] concurrently without storing the papers."""
+        if self.http_cache is None:
+            self.http_cache = HTTPCache(self.HTTP_CACHE_FILE, max_bytes=self.HTTP_CACHE_MAX_BYTES,
+                                        frozen_before_year=self.FROZEN_BEFORE_YEAR)
+
+        self.stage_timings = {'fetch': 0.0, 'parse': 0.0, 'max_loop_stall': 0.0}
+        connections_before = dict(self.connection_stats)
+        # Fetching stays on the event loop; parsing large year indexes goes to worker
+        # processes so it does not stall the other in-flight requests.
+        self.parse_executor = (concurrent.futures.ProcessPoolExecutor(max_workers=self.PARSE_PROCESSES)
+                               if self.PARSE_PROCESSES else None)
+        monitor = asyncio.create_task(self.monitor_loop_stall())
+        try:
+            session = RateLimitedSession(await self.http_session(), self.rate_limiter)
+            tasks = [self.scrape_year(session, year, raise_errors) for year in range(start_year, end_year + 1)]
+            results = await asyncio.gather(*tasks)
+            all_papers = list(itertools.chain.from_iterable(results)) # Flatten list of lists
+        finally:
+            monitor.cancel()
+            if self.parse_executor is not None:
+                self.parse_executor.shutdown()
+                self.parse_executor = None
+        self.log(f"HTTP cache: {self.http_cache.stats()}")
+        self.log(f"Rate limiter: {self.rate_limiter.stats()}")
+        self.log(f"Connections: {self.connection_report(connections_before)}")
+        self.log("Stage timings: fetch {fetch:.2f}s, parse {parse:.2f}s (summed over years), "
+                 "max event loop stall {max_loop_stall:.3f}s".format(**self.stage_timings))
+        return all_papers
+
+    async def monitor_loop_stall(self, interval=0.01):
+        """Records the longest time the event loop was blocked past a short sleep."""
+        loop = asyncio.get_running_loop()
+        while True:
+            before = loop.time()
+            await asyncio.sleep(interval)
+            stall = loop.time() - before - interval
+            self.stage_timings['max_loop_stall'] = max(self.stage_timings['max_loop_stall'], stall)
+
+    def load_metadata(self, start_year: int = None, end_year: int = None) -> List[Paper]:
+        return list(self.store.iter_papers(start_year, end_year))
+
+    def save_papers(self, papers: List[Paper]):
+        new_papers = self.store.upsert(papers)
+        self.log(f"Stored {len(papers)} papers ({new_papers} new) in {self.store.path}")
+        if self.EXPORT_CSV:
+            self.export_csv()
+
+    def export_csv(self, path=None, start_year: int = None, end_year: int = None) -> int:
+        path = path or self.csv_path
+        rows = self.store.export_csv(path, start_year, end_year)
+        self.log(f"Exported {rows} papers to {path}")
+        return rows
+
+    def content_store(self) -> ContentStore:
+        # The UI may point download_dir somewhere else between runs.
+        if self.content is None or self.content.directory != self.download_dir:
+            if self.content is not None:
+                self.content.close()
+            self.content = ContentStore(self.download_dir)
+        return self.content
+
+    def pdf_path(self, paper: Paper) -> Path:
+        """Readable name for the paper's PDF; same-title papers get a hash suffix."""
+        title = ''.join(c if c.isalnum() else '_' for c in paper.title)
+        return self.download_dir / self.content_store().name_for(paper.hash, f"{title}_{paper.year}.pdf")
+
+    def dedupe_pdfs(self, directories=()) -> Dict[str, int]:
+        """Moves PDFs in download_dir (and mirror directories) into the content store.
+
+        Files the manifest says were downloaded for a stored paper are registered
+        under that paper first; everything else is stored by content alone.
+        Duplicates end up as links to one copy. Returns the counts.
+        """
+        content = self.content_store()
+        manifest = DownloadManifest(self.download_dir)
+        adopted = 0
+        for paper in self.store.iter_papers():
+            entry = manifest.get(paper.pdf_link)
+            if not entry or not entry.get('complete') or content.lookup(paper.hash) is not None:
+                continue
+            path = self.download_dir / entry['path']
+            if path.is_file() and content.adopt(path, paper.hash, paper.title, paper.year, entry.get('sha256')):
+                adopted += 1
+        stats = content.dedupe(directories)
+        stats['adopted'] = adopted
+        self.log(f"Content store: {stats}")
+        return stats
+
+    def search_index(self) -> SearchIndex:
+        return SearchIndex(str(self.download_dir / INDEX_FILENAME))
+
+    def index_pdfs(self, processes: int = None) -> Dict[str, int]:
+        """Adds new or changed PDFs in download_dir to the full-text index; returns the counts."""
+        documents = []
+        known_paths = set()
+        for paper in self.store.iter_papers():
+            path = self.pdf_path(paper)
+            known_paths.add(path.name)
+            documents.append((paper.hash, paper.year, paper.title, path))
+        # PDFs without a scrape record (e.g. from Scrapper.py) are keyed by file name.
+        for path in sorted(self.download_dir.glob('*.pdf')):
+            if path.name not in known_paths:
+                documents.append((path.stem, None, path.stem, path))
+
+        def on_progress(done, total):
+            self.emit('progress', percent=done / total * 100)
+        index = self.search_index()
+        try:
+            counts = index.update(documents, processes or self.INDEX_PROCESSES, self.PDF_EXTRACTOR, on_progress)
+        finally:
+            index.close()
+        self.log(f"Search index: {counts}")
+        return counts
+
+    def search(self, query: str, limit: int = 10, start_year: int = None, end_year: int = None):
+        index_path = self.download_dir / INDEX_FILENAME
+        if not index_path.exists():
+            # Opening it would create an empty index (or fail if the directory is missing).
+            raise FileNotFoundError(f"No search index at {index_path}")
+        index = self.search_index()
+        try:
+            return index.search(query, limit, start_year, end_year)
+        finally:
+            index.close()
+
+    async def content_lengths(self, papers: List[Paper]) -> Dict[str, Optional[int]]:
+        """PDF sizes by paper hash from HEAD requests; None where the server does not say."""
+        session = RateLimitedSession(await self.http_session(), self.rate_limiter)
+
+        async def content_length(paper):
+            try:
+                async with session.head(paper.pdf_link, headers={'User-Agent': random.choice(USER_AGENTS)},
+                                        timeout=30, allow_redirects=True) as response:
+                    length = response.headers.get('Content-Length')
+                    return paper.hash, int(length) if response.status == 200 and length else None
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                return paper.hash, None
+        return dict(await asyncio.gather(*(content_length(paper) for paper in papers)))
+
+    async def download_selected(self, papers: List[Paper], schedule: DownloadSchedule,
+                                budget: DownloadBudget = None, concurrency: int = None) -> Dict[str, int]:
+        """Downloads the papers schedule selects, in its order, until budget runs out."""
+        budget = budget or DownloadBudget()
+        budget.start()
+        selected = schedule.select(papers)
+        self.log(f"Selected {len(selected)} of {len(papers)} papers for download")
+        sizes = None
+        if schedule.order == 'smallest' and selected:
+            content = self.content_store()
+            sizes = await self.content_lengths([paper for paper in selected if content.lookup(paper.hash) is None])
+            selected = schedule.select(selected, sizes)
+        return await self.download_all(selected, concurrency, budget, sizes)
+
+    async def download_all(self, papers: List[Paper], concurrency: int = None, budget: DownloadBudget = None,
+                           sizes: Dict[str, Optional[int]] = None) -> Dict[str, int]:
+        """Downloads the PDFs for papers through a bounded worker pool; returns the final counts.
+
+        With a budget, no download starts once it is spent; sizes (by paper
+        hash) let it reserve bytes before a download starts.
+        """
+        download_dir = self.download_dir
+        download_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest = DownloadManifest(download_dir)
+        content = self.content_store()
+        concurrency = concurrency or self.MAX_CONCURRENT_DOWNLOADS
+        connections_before = dict(self.connection_stats)
+        total = len(papers)
+        stats = {'downloaded': 0, 'failed_download': 0, 'skipped': 0}
+        self.emit('stats', total_papers=total, **stats)
+        session = RateLimitedSession(await self.http_session(), self.rate_limiter)
+        completed = 0
+        claimed = set()
+
+        queue = asyncio.Queue()
+        for paper in papers:
+            queue.put_nowait(paper)
+
+        # Workers run on one event loop, so the shared counters need no locking;
+        # progress is driven by completions rather than queue position because
+        # downloads finish out of order.
+        async def worker():
+            nonlocal completed
+            while True:
+                try:
+                    paper = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                # Storing can fail too (disk full, a name another paper owns); that costs
+                # this paper, not the other downloads in flight.
+                try:
+                    path = self.pdf_path(paper)
+                    title = path.stem
+
+                    sha256 = content.lookup(paper.hash)
+                    if sha256 is None and self.manifest.is_complete(paper.pdf_link, path):
+                        # Downloaded under its readable name before the content store existed.
+                        sha256 = await asyncio.to_thread(content.adopt, path, paper.hash, paper.title, paper.year,
+                                                         self.manifest.get(paper.pdf_link).get('sha256'))
+                    if sha256 is not None or paper.hash in claimed:
+                        if sha256 is not None:
+                            content.link(sha256, path, paper_hash=paper.hash)  # brings back a deleted readable name
+                        self.log(f"Skipping existing: {title} ({paper.year})")
+                        stats['skipped'] += 1
+                        self.emit('stats', skipped=stats['skipped'])
+                    else:
+                        size = sizes.get(paper.hash) if sizes else None
+                        if budget is not None and not budget.admit(size):
+                            return
+                        claimed.add(paper.hash)
+                        self.log(f"Downloading: {title} ({paper.year})")
+                        staging_path = content.staging_path(paper.hash)
+                        if await self.download_pdf(session, paper.pdf_link, str(staging_path)):
+                            entry = self.manifest.get(paper.pdf_link)
+                            content.put(staging_path, path.name, paper.hash, paper.title, paper.year, entry['sha256'])
+                            if budget is not None:
+                                budget.record(size, entry['bytes_written'])
+                            stats['downloaded'] += 1
+                            self.emit('stats', downloaded=stats['downloaded'])
+                        else:
+                            if budget is not None:
+                                budget.record(size, 0)
+                            stats['failed_download'] += 1
+                            self.emit('stats', failed_download=stats['failed_download'])
+                except (OSError, ValueError) as e:
+                    self.log(f"Error storing {paper.title} ({paper.year}): {e}")
+                    stats['failed_download'] += 1
+                    self.emit('stats', failed_download=stats['failed_download'])
+                completed += 1
+                self.emit('progress', percent=(completed / total) * 100)
+
+        await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, total)))))
+        if budget is not None and budget.exhausted:
+            self.log(f"Download budget ({budget.exhausted}) used up after {budget.bytes / 2**20:.1f} MiB; "
+                     f"{total - completed} papers left for a later run")
+        self.log(f"Rate limiter: {self.rate_limiter.stats()}")
+        self.log(f"Connections: {self.connection_report(connections_before)}")
+        self.emit('stats', total_papers=total, **stats)
+        return stats
+
+    def coordinate(self, queue: WorkQueue, start_year: int, end_year: int, shards: int = None) -> Dict[str, int]:
+        """Drives a distributed crawl of [start_year, end_year] until every queued task has finished.
+
+        Queues one scrape task per year, newest first. Each scraped year is
+        merged into this engine's store and split into download tasks by
+        paper hash; workers keep their PDFs in their own download directories.
+        Safe to restart: tasks are keyed by year and shard, and merging the
+        same results again only re-upserts them.
+        """
+        shards = shards or self.DOWNLOAD_SHARDS
+        queue.set_meta('closed', '')
+        for year in range(end_year, start_year - 1, -1):
+            queue.add(f"scrape:{year}", 'scrape', {'year': year})
+        totals = {'papers': 0, 'downloaded': 0, 'failed_download': 0, 'skipped': 0}
+        seq = 0
+        while True:
+            results = queue.results(after=seq)
+            for task_id, kind, payload, result, seq in results:
+                if kind == 'scrape':
+                    papers = [Paper(*row) for row in result['papers']]
+                    new_papers = self.store.upsert(papers)
+                    totals['papers'] += len(papers)
+                    by_shard = {}
+                    for paper in papers:
+                        by_shard.setdefault(shard_of(paper.hash, shards), []).append(paper.row())
+                    for shard, rows in sorted(by_shard.items()):
+                        queue.add(f"download:{payload['year']}:{shard}", 'download',
+                                  {'year': payload['year'], 'shard': shard, 'papers': rows})
+                    self.log(f"Year {payload['year']}: merged {len(papers)} papers ({new_papers} new) "
+                             f"from {result['worker']}, queued {len(by_shard)} download tasks")
+                else:
+                    for key in ('downloaded', 'failed_download', 'skipped'):
+                        totals[key] += result[key]
+            counts = queue.counts()
+            finished = sum(count for (_, state), count in counts.items() if state in ('done', 'failed'))
+            active = sum(counts.values()) - finished
+            self.emit('progress', percent=finished / max(1, sum(counts.values())) * 100)
+            if not active and not results:
+                break
+            if not results:
+                time.sleep(self.QUEUE_POLL_INTERVAL)
+        queue.set_meta('closed', '1')
+        for task_id, error in queue.failed():
+            self.log(f"Gave up on {task_id}: {error}")
+        if self.EXPORT_CSV:
+            self.export_csv()
+        return totals
+
+    async def work(self, queue: WorkQueue, worker_id: str, idle_timeout: float = None) -> int:
+        """Claims and runs tasks from the queue until the coordinator closes it; returns tasks completed.
+
+        Stops early after idle_timeout seconds without a task, if given.
+        """
+        # The coordinator's store decides what is new, so workers always report whole years.
+        self.incremental = False
+        completed = 0
+        idle_since = time.monotonic()
+        while True:
+            lease = await asyncio.to_thread(queue.claim, worker_id, self.LEASE_SECONDS, self.MAX_TASK_ATTEMPTS)
+            if lease is None:
+                if queue.get_meta('closed') or (idle_timeout is not None
+                                                and time.monotonic() - idle_since > idle_timeout):
+                    return completed
+                await asyncio.sleep(self.QUEUE_POLL_INTERVAL)
+                continue
+            self.log(f"{worker_id}: running {lease.task_id} (attempt {lease.attempts})")
+            task = asyncio.create_task(self.run_task(lease, worker_id))
+            lost = asyncio.Event()
+            heartbeat = asyncio.create_task(self.keep_lease(queue, lease, worker_id, task, lost))
+            try:
+                result = await task
+            except asyncio.CancelledError:
+                if not lost.is_set():
+                    raise
+                self.log(f"{worker_id}: lost the lease on {lease.task_id}, dropping it")
+            except Exception as e:
+                self.log(f"{worker_id}: {lease.task_id} failed: {e!r}")
+                await asyncio.to_thread(queue.fail, lease.task_id, worker_id, repr(e),
+                                        self.QUEUE_POLL_INTERVAL * lease.attempts, self.MAX_TASK_ATTEMPTS)
+            else:
+                if await asyncio.to_thread(queue.complete, lease.task_id, worker_id, result):
+                    completed += 1
+            finally:
+                heartbeat.cancel()
+            idle_since = time.monotonic()
+
+    async def keep_lease(self, queue: WorkQueue, lease: Lease, worker_id: str, task: asyncio.Task,
+                         lost: asyncio.Event):
+        """Heartbeats the lease while task runs; cancels task if the lease has moved to another worker."""
+        while True:
+            await asyncio.sleep(self.LEASE_SECONDS / 3)
+            if not await asyncio.to_thread(queue.heartbeat, lease.task_id, worker_id, self.LEASE_SECONDS):
+                lost.set()
+                task.cancel()
+                return
+
+    async def run_task(self, lease: Lease, worker_id: str) -> Dict:
+        if lease.kind == 'scrape':
+            year = lease.payload['year']
+            papers = await self.fetch_papers(year, year, raise_errors=True)
+            return {'worker': worker_id, 'papers': [paper.row() for paper in papers]}
+        if lease.kind == 'download':
+            papers = [Paper(*row) for row in lease.payload['papers']]
+            return {'worker': worker_id, **await self.download_all(papers)}
+        raise ValueError(f"Unknown task kind {lease.kind!r}")
+
+
+def print_event(kind: str, data: Dict):
+    if kind == 'log':
+        print(data['message'], flush=True)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Scrape NeurIPS proceedings metadata and PDFs without the GUI.")
+    arg_parser.add_argument('--store', default=ScraperEngine.METADATA_STORE_FILE,
+                            help="metadata store, .sqlite or .parquet (default: %(default)s)")
+    arg_parser.add_argument('--csv', default=ScraperEngine.CSV_OUTPUT_FILE, help="CSV export (default: %(default)s)")
+    arg_parser.add_argument('--metrics-json', metavar='PATH', help="write per-stage timings as JSON when done")
+    arg_parser.add_argument('--metrics-prom', metavar='PATH', help="write metrics in Prometheus text format when done")
+    arg_parser.add_argument('--metrics-port', type=int, metavar='PORT', help="serve Prometheus metrics while running")
+    arg_parser.add_argument('--profile', metavar='PATH', help="profile the run into a pstats file")
+    arg_parser.add_argument('--profiler', choices=sorted(PROFILERS), default='cprofile',
+                            help="profiler for --profile; yappi also covers worker threads (default: %(default)s)")
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+
+    scrape = commands.add_parser('scrape', help="scrape metadata for a year range into the store")
+    download = commands.add_parser('download', help="download PDFs for the papers in the store")
+    run = commands.add_parser('run', help="scrape a year range, then download its PDFs")
+    export = commands.add_parser('export', help="write the stored papers to the CSV")
+    index = commands.add_parser('index', help="extract text from downloaded PDFs into the search index")
+    search = commands.add_parser('search', help="full-text search over the indexed PDFs")
+    search.add_argument('query', help="search terms")
+    search.add_argument('--limit', type=int, default=10, help="results to show (default: %(default)s)")
+    dedupe = commands.add_parser('dedupe', help="move downloaded PDFs into the content store, linking duplicates")
+    dedupe.add_argument('mirrors', nargs='*', help="other directories of PDFs to deduplicate against the store")
+    coordinate = commands.add_parser('coordinate', help="queue a year range for workers and merge their results")
+    coordinate.add_argument('--shards', type=int, default=ScraperEngine.DOWNLOAD_SHARDS,
+                            help="download tasks per year (default: %(default)s)")
+    work = commands.add_parser('work', help="run tasks from a coordinator's queue")
+    work.add_argument('--worker-id', default=f"{socket.gethostname()}:{os.getpid()}",
+                      help="name shown in the queue (default: host:pid)")
+    work.add_argument('--idle-exit', type=float, metavar='SECONDS', help="stop after this long without a task")
+    for command in (coordinate, work):
+        command.add_argument('--queue', default=QUEUE_FILENAME,
+                             help="shared work queue: SQLite path or redis:// URL (default: %(default)s)")
+    for command in (scrape, run, coordinate):
+        command.add_argument('--start', type=int, default=2018, help="first year (default: %(default)s)")
+        command.add_argument('--end', type=int, default=time.localtime().tm_year, help="last year (default: %(default)s)")
+        if command is not coordinate:
+            command.add_argument('--full', action='store_true', help="rescrape unchanged years and known papers")
+    for command in (download, export, search):
+        command.add_argument('--start', type=int, help="first year (default: all stored years)")
+        command.add_argument('--end', type=int, help="last year (default: all stored years)")
+    for command in (download, run, index, search, dedupe, work):
+        command.add_argument('--dir', default='Scrapped_PDFs', help="download directory (default: %(default)s)")
+    for command in (download, run, work):
+        command.add_argument('--concurrency', type=int, default=ScraperEngine.MAX_CONCURRENT_DOWNLOADS,
+                             help="concurrent downloads (default: %(default)s)")
+    for command in (download, run):
+        command.add_argument('--title', metavar='REGEX', help="only papers whose title matches")
+        command.add_argument('--author', metavar='REGEX', help="only papers with a matching author")
+        command.add_argument('--keywords', nargs='+', default=(), metavar='WORD',
+                             help="only papers with any of these words in the title")
+        command.add_argument('--order', choices=ORDERS, default='scrape',
+                             help="download order; 'smallest' sends a HEAD request per paper (default: %(default)s)")
+        command.add_argument('--priority-file', metavar='PATH',
+                             help="paper hashes or titles, one per line, to download before the rest")
+        command.add_argument('--max-mb', type=float, help="start no downloads after this many MiB")
+        command.add_argument('--max-minutes', type=float, help="start no downloads after this many minutes")
+    args = arg_parser.parse_args(argv)
+
+    engine = ScraperEngine(download_dir=getattr(args, 'dir', 'Scrapped_PDFs'), csv_path=args.csv,
+                           store_path=args.store, incremental=not getattr(args, 'full', False),
+                           on_event=print_event)
+    engine.metrics.enabled = bool(args.metrics_json or args.metrics_prom or args.metrics_port)
+    if args.metrics_port:
+        engine.metrics.serve(args.metrics_port)
+    try:
+        with profile(args.profile, args.profiler):
+            run_command(engine, args, arg_parser)
+    finally:
+        engine.close()
+        if args.metrics_json:
+            engine.metrics.write_json(args.metrics_json)
+        if args.metrics_prom:
+            engine.metrics.write_prometheus(args.metrics_prom)
+
+
+def run_command(engine: ScraperEngine, args: argparse.Namespace, arg_parser: argparse.ArgumentParser):
+    started = time.time()
+    if args.command == 'export':
+        engine.export_csv(args.csv, args.start, args.end)
+        return
+    if args.command == 'index':
+        engine.index_pdfs()
+        print(f"Indexed in {time.time() - started:.2f}s")
+        return
+    if args.command == 'dedupe':
+        stats = engine.dedupe_pdfs(args.mirrors)
+        print(f"Linked {stats['linked']} duplicate files, freed {stats['bytes_saved'] / 2**20:.1f} MiB "
+              f"in {time.time() - started:.2f}s")
+        return
+    if args.command in ('coordinate', 'work'):
+        queue = open_queue(args.queue)
+        try:
+            if args.command == 'coordinate':
+                totals = engine.coordinate(queue, args.start, args.end, args.shards)
+                print(f"Merged {totals['papers']} papers; workers downloaded {totals['downloaded']}, "
+                      f"failed {totals['failed_download']}, skipped {totals['skipped']} "
+                      f"in {time.time() - started:.2f}s")
+            else:
+                engine.MAX_CONCURRENT_DOWNLOADS = args.concurrency
+                completed = engine.run(engine.work(queue, args.worker_id, args.idle_exit))
+                print(f"{args.worker_id}: completed {completed} tasks in {time.time() - started:.2f}s")
+        finally:
+            queue.close()
+        return
+    if args.command == 'search':
+        if not (engine.download_dir / INDEX_FILENAME).exists():
+            arg_parser.error(f"no search index in {engine.download_dir}; run 'index' first")
+        results = engine.search(args.query, args.limit, args.start, args.end)
+        for score, paper_hash, year, title, path in results:
+            print(f"{score:7.2f}  {year or '----'}  {title}\n         {path}")
+        print(f"{len(results)} results in {(time.time() - started) * 1000:.0f} ms")
+        return
+    if args.command in ('download', 'run'):
+        try:
+            priority = load_priority(args.priority_file) if args.priority_file else ()
+            schedule = DownloadSchedule(title_pattern=args.title, author_pattern=args.author,
+                                        keywords=args.keywords, order=args.order, priority=priority)
+        except (OSError, re.error) as e:
+            arg_parser.error(str(e))
+        budget = DownloadBudget(args.max_mb * 2**20 if args.max_mb is not None else None,
+                                args.max_minutes * 60 if args.max_minutes is not None else None)
+    if args.command in ('scrape', 'run'):
+        papers = engine.run(engine.scrape_range(args.start, args.end))
+        print(f"Scraped {len(papers)} papers in {time.time() - started:.2f}s")
+    if args.command in ('download', 'run'):
+        # An incremental scrape returns only new papers; anything stored earlier but
+        # never downloaded is picked up here, and already stored PDFs are skipped.
+        papers = engine.load_metadata(args.start, args.end)
+    if args.command == 'download':
+        if not papers:
+            arg_parser.error(f"no matching papers in {args.store}; run the 'scrape' command first")
+    if args.command in ('download', 'run'):
+        stats = engine.run(engine.download_selected(papers, schedule, budget, args.concurrency))
+        print(f"Downloaded {stats['downloaded']}, failed {stats['failed_download']}, "
+              f"skipped {stats['skipped']} in {time.time() - started:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""Virtualized paper list for the Tk window.
+
+ttk.Treeview keeps a Tcl item per row, so inserting tens of thousands of
+papers freezes the window and holds on to a lot of memory. ``PaperStore``
+keeps the rows as plain column lists plus the index of the rows currently
+shown after filtering and sorting; ``PaperTable`` gives its Treeview only as
+many items as fit on screen and rewrites their values as the user scrolls.
+"""
+from collections import deque
+import tkinter as tk
+from tkinter import ttk
+
+COLUMNS = ('title', 'authors', 'year', 'pdf_link')
+# Heading, width and anchor per column, as in the original results view.
+COLUMN_SPECS = {
+    'title': ("Title", 400, 'w'),
+    'authors': ("Authors", 300, 'w'),
+    'year': ("Year", 80, 'center'),
+    'pdf_link': ("PDF Link", 250, 'w'),
+}
+SEARCHED_COLUMNS = ('title', 'authors')
+
+
+class PaperStore:
+    """Column-oriented paper records and the filtered, sorted view over them."""
+
+    def __init__(self):
+        self.columns = {name: [] for name in COLUMNS}
+        self.folded = {name: [] for name in SEARCHED_COLUMNS}  # Lowercased copies for filtering and sorting
+        self.view = []
+        self.sort_column = None
+        self.descending = False
+        self.query = ''
+        self.year = None
+
+    def __len__(self):
+        return len(self.columns['title'])
+
+    def clear(self):
+        for values in (*self.columns.values(), *self.folded.values()):
+            values.clear()
+        self.view = []
+
+    def extend(self, papers):
+        start = len(self)
+        for name in COLUMNS:
+            self.columns[name].extend(str(getattr(paper, name)) for paper in papers)
+        for name in SEARCHED_COLUMNS:
+            self.folded[name].extend(value.lower() for value in self.columns[name][start:])
+        if self.sort_column is None and not self.query and self.year is None:
+            self.view.extend(range(start, len(self)))
+        else:
+            self.refresh()
+
+    def set_filter(self, query='', year=None):
+        self.query = query.strip().lower()
+        self.year = year
+        self.refresh()
+
+    def sort(self, column):
+        """Sorts by column, toggling the direction when it is already the sort column."""
+        self.descending = not self.descending if column == self.sort_column else False
+        self.sort_column = column
+        self.refresh()
+
+    def refresh(self):
+        rows = range(len(self))
+        if self.year is not None:
+            years = self.columns['year']
+            rows = [i for i in rows if years[i] == self.year]
+        if self.query:
+            titles, authors, query = self.folded['title'], self.folded['authors'], self.query
+            rows = [i for i in rows if query in titles[i] or query in authors[i]]
+        rows = list(rows)
+        if self.sort_column is not None:
+            keys = self.folded.get(self.sort_column) or self.columns[self.sort_column]
+            rows.sort(key=keys.__getitem__, reverse=self.descending)
+        self.view = rows
+
+    def row(self, position):
+        """Column values of the row at a position in the current view."""
+        index = self.view[position]
+        return tuple(self.columns[name][index] for name in COLUMNS)
+
+    def years(self):
+        return sorted(set(self.columns['year']))
+
+
+class PaperTable(ttk.Frame):
+    """Treeview that only materializes the visible rows of a PaperStore.
+
+    Rows passed to ``add`` are moved into the store ``batch_size`` at a time
+    from ``after`` callbacks, so loading a large CSV never blocks the event
+    loop for long. Generates ``<<ViewChanged>>`` whenever the set of shown
+    rows changes.
+    """
+
+    def __init__(self, master, batch_size=5000, **kwargs):
+        super().__init__(master, **kwargs)
+        self.store = PaperStore()
+        self.batch_size = batch_size
+        self.pending = deque()
+        self.offset = 0
+        self.slots = []
+        self.drain_job = None
+        self.fit_job = None
+
+        self.tree = ttk.Treeview(self, columns=COLUMNS, show='headings', style='Treeview', selectmode='browse')
+        for name in COLUMNS:
+            heading, width, anchor = COLUMN_SPECS[name]
+            self.tree.heading(name, text=heading, command=lambda name=name: self.sort_by(name))
+            self.tree.column(name, width=width, anchor=anchor)
+        # The Treeview never scrolls itself; the scrollbar moves the window over the store instead.
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self.yview, style='Vertical.TScrollbar')
+        hsb = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview, style='Horizontal.TScrollbar')
+        self.tree.configure(xscrollcommand=hsb.set)
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        self.vsb.grid(row=0, column=1, sticky='ns')
+        hsb.grid(row=1, column=0, sticky='ew')
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.tree.bind('<Configure>', self.on_resize)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.tree.bind(sequence, self.on_wheel)
+        self.tree.bind('<Prior>', lambda event: self.yview('scroll', -1, 'pages') or 'break')
+        self.tree.bind('<Next>', lambda event: self.yview('scroll', 1, 'pages') or 'break')
+
+    def row_metrics(self):
+        """(headings height, row height, measured) in pixels; estimated from the style until a row is drawn."""
+        bbox = self.tree.bbox(self.slots[0]) if self.slots else ''
+        if bbox:
+            return bbox[1], bbox[3], True
+        height = int(ttk.Style(self).lookup('Treeview', 'rowheight') or 20)
+        return height, height, False
+
+    def on_resize(self, event):
+        if self.fit_job is None:
+            self.fit_job = self.after_idle(self.fit_rows)
+
+    def fit_rows(self):
+        """Keeps exactly as many items as fit without the Treeview scrolling."""
+        self.fit_job = None
+        top, height, measured = self.row_metrics()
+        wanted = max(1, (self.tree.winfo_height() - top) // height)
+        while len(self.slots) < wanted:
+            self.slots.append(self.tree.insert('', tk.END, values=()))
+        while len(self.slots) > wanted:
+            self.tree.delete(self.slots.pop())
+        self.scroll_to(self.offset)
+        self.render()
+        if not measured and self.tree.winfo_viewable():
+            # The estimate came from the style; refit once the rows have been drawn.
+            self.fit_job = self.after(50, self.fit_rows)
+
+    def on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.yview('scroll', -3, 'units')
+        else:
+            self.yview('scroll', 3, 'units')
+        return 'break'
+
+    def yview(self, *args):
+        total, visible = len(self.store.view), len(self.slots)
+        if args[0] == 'moveto':
+            offset = int(float(args[1]) * total)
+        else:
+            step = int(args[1]) * (visible if args[2] == 'pages' else 1)
+            offset = self.offset + step
+        self.scroll_to(offset)
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, len(self.store.view) - len(self.slots)))
+        if offset != self.offset:
+            self.offset = offset
+            self.tree.selection_set(())
+            self.render()
+
+    def render(self):
+        view = self.store.view
+        for k, slot in enumerate(self.slots):
+            position = self.offset + k
+            self.tree.item(slot, values=self.store.row(position) if position < len(view) else ())
+        if view:
+            self.vsb.set(self.offset / len(view), min(1.0, (self.offset + len(self.slots)) / len(view)))
+        else:
+            self.vsb.set(0.0, 1.0)
+
+    def view_changed(self):
+        self.offset = 0
+        self.tree.selection_set(())
+        self.render()
+        self.event_generate('<<ViewChanged>>')
+
+    def add(self, papers):
+        for start in range(0, len(papers), self.batch_size):
+            self.pending.append(papers[start:start + self.batch_size])
+        if self.drain_job is None:
+            self.drain_job = self.after(0, self.drain)
+
+    def drain(self):
+        self.store.extend(self.pending.popleft())
+        if self.pending:
+            self.drain_job = self.after(1, self.drain)
+        else:
+            self.drain_job = None
+        # Appending to an unsorted view does not move the rows already on screen.
+        self.render()
+        self.event_generate('<<ViewChanged>>')
+
+    def clear(self):
+        self.pending.clear()
+        if self.drain_job is not None:
+            self.after_cancel(self.drain_job)
+            self.drain_job = None
+        self.store.clear()
+        self.view_changed()
+
+    def sort_by(self, column):
+        self.store.sort(column)
+        for name in COLUMNS:
+            arrow = (' ▼' if self.store.descending else ' ▲') if name == column else ''
+            self.tree.heading(name, text=COLUMN_SPECS[name][0] + arrow)
+        self.view_changed()
+
+    def set_filter(self, query='', year=None):
+        self.store.set_filter(query, year)
+        self.view_changed()
@@ -0,0 +1,272 @@
+"""Extractors for the three kinds of NeurIPS pages the scrapers read.
+
+Every backend implements the same three functions and returns the same
+records, so callers can swap them freely:
+
+* ``proceedings_links(html)`` - hrefs of the per-year proceedings pages
+* ``year_index(html)`` - ``{'title', 'authors', 'href'}`` for each
+  ``a[title='paper title']`` inside ``ul.paper-list``
+* ``paper_page(html)`` - ``{'title', 'pdf_href'}`` from the first ``h4`` and
+  the first ``a[href$='.pdf']`` (either may be None)
+
+Authors are read from the ``<i>`` or ``.paper-authors`` element in the same
+``<li>`` as the title link. The lxml and selectolax backends are only offered
+when those packages are installed; the SoupStrainer and regex backends work
+with the base requirements.
+"""
+import re
+import html as htmllib
+from bs4 import BeautifulSoup, SoupStrainer
+
+from scrape_state import paper_hash
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    HTMLParser = None
+
+PROCEEDINGS_PREFIX = '/paper_files/paper/'
+# Fastest first; the regex backend is opt-in because it relies on the exact markup.
+DEFAULT_ORDER = ('selectolax', 'lxml', 'strainer')
+
+
+class SelectolaxParser:
+    name = 'selectolax'
+
+    @staticmethod
+    def _ancestor_li(node):
+        while node is not None and node.tag != 'li':
+            node = node.parent
+        return node
+
+    @staticmethod
+    def proceedings_links(html):
+        return [a.attributes['href'] for a in HTMLParser(html).css(f"a[href^='{PROCEEDINGS_PREFIX}']")]
+
+    @staticmethod
+    def year_index(html):
+        records = []
+        for a in HTMLParser(html).css("ul.paper-list a[title='paper title']"):
+            li = SelectolaxParser._ancestor_li(a)
+            authors = li.css_first('i, .paper-authors') if li is not None else None
+            records.append({
+                'title': a.text().strip(),
+                'authors': authors.text().strip() if authors is not None else '',
+                'href': a.attributes.get('href') or '',
+            })
+        return records
+
+    @staticmethod
+    def paper_page(html):
+        tree = HTMLParser(html)
+        title = tree.css_first('h4')
+        pdf = tree.css_first("a[href$='.pdf']")
+        return {'title': title.text().strip() if title is not None else None,
+                'pdf_href': pdf.attributes['href'] if pdf is not None else None}
+
+
+class LxmlParser:
+    name = 'lxml'
+
+    _PAPER_LINKS = ("//ul[contains(concat(' ', normalize-space(@class), ' '), ' paper-list ')]"
+                    "//a[@title='paper title']")
+    _AUTHORS = ".//i | .//*[contains(concat(' ', normalize-space(@class), ' '), ' paper-authors ')]"
+
+    @staticmethod
+    def _document(html):
+        return lxml.html.fromstring(html) if html.strip() else None
+
+    @staticmethod
+    def proceedings_links(html):
+        doc = LxmlParser._document(html)
+        if doc is None:
+            return []
+        return doc.xpath(f"//a[starts-with(@href, '{PROCEEDINGS_PREFIX}')]/@href")
+
+    @staticmethod
+    def year_index(html):
+        doc = LxmlParser._document(html)
+        if doc is None:
+            return []
+        records = []
+        for a in doc.xpath(LxmlParser._PAPER_LINKS):
+            li = next(a.iterancestors('li'), None)
+            authors = li.xpath(LxmlParser._AUTHORS) if li is not None else []
+            records.append({
+                'title': a.text_content().strip(),
+                'authors': authors[0].text_content().strip() if authors else '',
+                'href': a.get('href', ''),
+            })
+        return records
+
+    @staticmethod
+    def paper_page(html):
+        doc = LxmlParser._document(html)
+        if doc is None:
+            return {'title': None, 'pdf_href': None}
+        title = doc.xpath('(//h4)[1]')
+        pdf = doc.xpath("(//a[substring(@href, string-length(@href) - 3) = '.pdf'])[1]/@href")
+        return {'title': title[0].text_content().strip() if title else None,
+                'pdf_href': pdf[0] if pdf else None}
+
+
+class StrainerParser:
+    """BeautifulSoup, but only building the part of the tree we read."""
+    name = 'strainer'
+
+    _PROCEEDINGS = SoupStrainer('a', href=re.compile('^' + re.escape(PROCEEDINGS_PREFIX)))
+    _PAPER_LIST = SoupStrainer('ul', class_='paper-list')
+    _PAPER_PAGE = SoupStrainer(['h4', 'a'])
+
+    @staticmethod
+    def proceedings_links(html):
+        soup = BeautifulSoup(html, 'html.parser', parse_only=StrainerParser._PROCEEDINGS)
+        return [a['href'] for a in soup.find_all('a')]
+
+    @staticmethod
+    def year_index(html):
+        soup = BeautifulSoup(html, 'html.parser', parse_only=StrainerParser._PAPER_LIST)
+        records = []
+        for a in soup.select("a[title='paper title']"):
+            li = a.find_parent('li')
+            authors = li.select_one('i, .paper-authors') if li else None
+            records.append({
+                'title': a.text.strip(),
+                'authors': authors.text.strip() if authors else '',
+                'href': a.get('href', ''),
+            })
+        return records
+
+    @staticmethod
+    def paper_page(html):
+        soup = BeautifulSoup(html, 'html.parser', parse_only=StrainerParser._PAPER_PAGE)
+        title = soup.find('h4')
+        pdf = soup.select_one("a[href$='.pdf']")
+        return {'title': title.text.strip() if title else None,
+                'pdf_href': pdf['href'] if pdf else None}
+
+
+class RegexParser:
+    """Single-pass extractor tied to the fixed NeurIPS proceedings markup."""
+    name = 'regex'
+
+    _HREF = re.compile(r'''\bhref\s*=\s*(["'])(.*?)\1''', re.S)
+    _ANCHOR = re.compile(r'<a\b([^>]*)>(.*?)</a\s*>', re.S | re.I)
+    _PAPER_LIST_START = re.compile(r'''<ul\b[^>]*\bclass\s*=\s*(["'])[^"']*\bpaper-list\b[^"']*\1[^>]*>''', re.I)
+    _LI_START = re.compile(r'<li\b[^>]*>', re.I)
+    _PAPER_TITLE = re.compile(r'''\btitle\s*=\s*(["'])paper title\1''')
+    _ITALIC = re.compile(r'<i\b[^>]*>(.*?)</i\s*>', re.S | re.I)
+    _AUTHORS_CLASS = re.compile(r'''\bclass\s*=\s*(["'])[^"']*\bpaper-authors\b[^"']*\1[^>]*>(.*?)</''', re.S | re.I)
+    _H4 = re.compile(r'<h4\b[^>]*>(.*?)</h4\s*>', re.S | re.I)
+    _PDF_HREF = re.compile(r'''<a\b[^>]*\bhref\s*=\s*(["'])([^"']*\.pdf)\1''', re.S | re.I)
+    _TAG = re.compile(r'<[^>]+>')
+
+    @staticmethod
+    def _text(fragment):
+        return htmllib.unescape(RegexParser._TAG.sub('', fragment)).strip()
+
+    @staticmethod
+    def _href(attrs):
+        match = RegexParser._HREF.search(attrs)
+        return htmllib.unescape(match.group(2)) if match else ''
+
+    @staticmethod
+    def proceedings_links(html):
+        hrefs = (RegexParser._href(m.group(1)) for m in RegexParser._ANCHOR.finditer(html))
+        return [href for href in hrefs if href.startswith(PROCEEDINGS_PREFIX)]
+
+    @staticmethod
+    def _paper_lists(html):
+        for start in RegexParser._PAPER_LIST_START.finditer(html):
+            end = html.find('</ul', start.end())
+            yield html[start.end():end if end != -1 else len(html)]
+
+    @staticmethod
+    def _authors(item):
+        match = RegexParser._ITALIC.search(item) or RegexParser._AUTHORS_CLASS.search(item)
+        return RegexParser._text(match.group(match.lastindex)) if match else ''
+
+    @staticmethod
+    def year_index(html):
+        records = []
+        for paper_list in RegexParser._paper_lists(html):
+            # Everything between two <li> openings belongs to one paper entry.
+            for item in RegexParser._LI_START.split(paper_list)[1:]:
+                for anchor in RegexParser._ANCHOR.finditer(item):
+                    if not RegexParser._PAPER_TITLE.search(anchor.group(1)):
+                        continue
+                    records.append({
+                        'title': RegexParser._text(anchor.group(2)),
+                        'authors': RegexParser._authors(item),
+                        'href': RegexParser._href(anchor.group(1)),
+                    })
+        return records
+
+    @staticmethod
+    def paper_page(html):
+        title = RegexParser._H4.search(html)
+        pdf = RegexParser._PDF_HREF.search(html)
+        return {'title': RegexParser._text(title.group(1)) if title else None,
+                'pdf_href': htmllib.unescape(pdf.group(2)) if pdf else None}
+
+
+BACKENDS = {'strainer': StrainerParser, 'regex': RegexParser}
+if lxml is not None:
+    BACKENDS['lxml'] = LxmlParser
+if HTMLParser is not None:
+    BACKENDS['selectolax'] = SelectolaxParser
+
+
+_ABSTRACT_HREF_RE = re.compile(r'^(?P<base>.*)/hash/(?P<hash>[^/]+)-Abstract(?P<track>-[^/.]+)?\.html$')
+
+
+def derive_pdf_href(abstract_href):
+    """PDF href for an abstract href, following the proceedings URL scheme, or None.
+
+    '/paper_files/paper/2023/hash/<h>-Abstract-Conference.html' maps to
+    '/paper_files/paper/2023/file/<h>-Paper-Conference.pdf'.
+    """
+    match = _ABSTRACT_HREF_RE.match(abstract_href)
+    if not match:
+        return None
+    return f"{match.group('base')}/file/{match.group('hash')}-Paper{match.group('track') or ''}.pdf"
+
+
+def year_papers(html, year, pdf_base, backend=None):
+    """Paper records for one year index page.
+
+    Module-level with plain str/list/dict arguments and results so the UI can
+    run it in a ProcessPoolExecutor instead of on the event loop.
+    """
+    papers = []
+    for entry in get_parser(backend).year_index(html):
+        abstract_url = entry['href']
+        if 'Abstract' in abstract_url:
+            # Same hash and track-aware PDF name as Scrapper.py, so both tools key a paper alike.
+            h = paper_hash(abstract_url)
+            pdf_href = derive_pdf_href(abstract_url)
+            pdf_name = pdf_href.rsplit('/', 1)[-1] if pdf_href else f"{h}-Paper.pdf"
+            papers.append({
+                'title': entry['title'],
+                'authors': entry['authors'],
+                'year': str(year),
+                'pdf_link': f"{pdf_base}/{pdf_name}",
+                'hash': h,
+            })
+    return papers
+
+
+def get_parser(name=None):
+    """Returns the named backend, or the fastest installed one when name is None."""
+    if name is None:
+        name = next(n for n in DEFAULT_ORDER if n in BACKENDS)
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown or unavailable parser backend {name!r}; "
+                         f"available: {', '.join(sorted(BACKENDS))}") from None
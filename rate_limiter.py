@@ -0,0 +1,265 @@
+"""Per-host request pacing shared by the threaded and the aiohttp scrapers.
+
+Every host gets a ``HostController`` that combines a token bucket (requests
+per second) with a concurrency window. Both grow additively while responses
+come back fast and healthy, and shrink multiplicatively on 429/503, other
+5xx responses or connection errors (AIMD, as in TCP congestion control).
+A Retry-After header pauses the whole host until it expires.
+
+``RateLimitedAdapter`` plugs the limiter into a ``requests.Session``;
+``RateLimitedSession`` wraps an ``aiohttp.ClientSession`` with the same
+``get()`` interface.
+"""
+import time
+import asyncio
+import threading
+import email.utils
+import aiohttp
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+
+THROTTLE_STATUSES = (429, 503)
+POLL_INTERVAL = 0.02        # How often a caller waiting for a concurrency slot re-checks
+DECREASE_FACTOR = 0.5       # Multiplicative decrease on throttling or errors
+RATE_STEP = 1.0             # Requests/s added per window of healthy responses
+LATENCY_FACTOR = 2.0        # Recent latency above this multiple of the long-run average stops growth
+FAST_SMOOTHING = 0.3        # EWMA weights for the recent and the long-run latency averages
+SLOW_SMOOTHING = 0.02
+MAX_RETRY_AFTER = 300.0
+TRANSFER_ERRORS = (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+class HostController:
+    """Token bucket plus AIMD concurrency window for one host. Thread-safe."""
+
+    def __init__(self, rate=5.0, concurrency=4, min_rate=0.5, max_rate=100.0,
+                 min_concurrency=1, max_concurrency=32):
+        self.rate = float(rate)
+        self.limit = float(concurrency)
+        self.min_rate, self.max_rate = min_rate, max_rate
+        self.min_concurrency, self.max_concurrency = min_concurrency, max_concurrency
+        self.in_flight = 0
+        self.tokens = 1.0
+        self.blocked_until = 0.0
+        self.avg_latency = None
+        self.baseline_latency = None
+        self.slow_start = True
+        self.counters = {'requests': 0, 'throttled': 0, 'errors': 0}
+        self._last_refill = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Takes a slot and returns None, or returns how long to wait before retrying."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.in_flight >= int(self.limit):
+                return POLL_INTERVAL
+            self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            if self.tokens < 1.0:
+                return (1.0 - self.tokens) / self.rate
+            self.tokens -= 1.0
+            self.in_flight += 1
+            return None
+
+    def acquire(self):
+        while (delay := self.try_acquire()) is not None:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        while (delay := self.try_acquire()) is not None:
+            await asyncio.sleep(delay)
+
+    def release(self, status=None, latency=None, retry_after=None):
+        """Returns a slot and feeds the outcome back; status None means a connection error."""
+        with self._lock:
+            now = time.monotonic()
+            self.in_flight -= 1
+            self.counters['requests'] += 1
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+            if status is None or status >= 500 or status in THROTTLE_STATUSES:
+                self.counters['throttled' if status in THROTTLE_STATUSES else 'errors'] += 1
+                self._decrease(now)
+            elif latency is not None:
+                self._observe(latency)
+                if self.avg_latency <= self.baseline_latency * LATENCY_FACTOR:
+                    # Like TCP: grow per response until the first congestion signal (slow
+                    # start), then by +1 slot and +RATE_STEP per window of healthy responses.
+                    step = 1.0 if self.slow_start else 1.0 / self.limit
+                    self.limit = min(self.max_concurrency, self.limit + step)
+                    self.rate = min(self.max_rate, self.rate + RATE_STEP * step)
+
+    def _observe(self, latency):
+        if self.avg_latency is None:
+            self.avg_latency = self.baseline_latency = latency
+            return
+        self.avg_latency += FAST_SMOOTHING * (latency - self.avg_latency)
+        self.baseline_latency += SLOW_SMOOTHING * (latency - self.baseline_latency)
+
+    def _decrease(self, now):
+        # A burst of throttled responses from one window only counts as one signal.
+        if now - self._last_decrease < (self.avg_latency or 1.0):
+            return
+        self._last_decrease = now
+        self.slow_start = False
+        self.limit = max(self.min_concurrency, self.limit * DECREASE_FACTOR)
+        self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, rate=round(self.rate, 2), concurrency=int(self.limit),
+                        avg_latency=self.avg_latency and round(self.avg_latency, 3))
+
+
+class RateLimiter:
+    """Registry of HostControllers, created on first use with shared defaults."""
+
+    def __init__(self, **controller_options):
+        self.controller_options = controller_options
+        self.hosts = {}
+        self._lock = threading.Lock()
+
+    def controller(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self.hosts:
+                self.hosts[host] = HostController(**self.controller_options)
+            return self.hosts[host]
+
+    def stats(self):
+        return {host: controller.stats() for host, controller in self.hosts.items()}
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that paces requests per host and retries 429/503 after backing off.
+
+    Throttling statuses should not be in the urllib3 Retry status list, or the
+    controller never sees them.
+    """
+
+    def __init__(self, limiter, throttle_retries=3, **kwargs):
+        self.limiter = limiter
+        self.throttle_retries = throttle_retries
+        super().__init__(**kwargs)
+
+    def send(self, request, stream=False, **kwargs):
+        controller = self.limiter.controller(request.url)
+        for attempt in range(self.throttle_retries + 1):
+            controller.acquire()
+            started = time.monotonic()
+            try:
+                response = super().send(request, stream=stream, **kwargs)
+            except Exception:
+                controller.release()
+                raise
+            latency = time.monotonic() - started
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if response.status_code in THROTTLE_STATUSES and attempt < self.throttle_retries:
+                controller.release(response.status_code, latency, retry_after)
+                response.close()
+                continue
+            if stream:
+                # Streamed bodies hold the slot until the caller closes the response.
+                self._release_on_close(response, controller, response.status_code, latency, retry_after)
+            else:
+                controller.release(response.status_code, latency, retry_after)
+            return response
+
+    def connection_stats(self):
+        """Connections opened and requests sent through the pools this adapter still holds."""
+        pools = self.poolmanager.pools
+        opened = sent = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                sent += pool.num_requests
+        reused = max(sent - opened, 0)
+        return {'opened': opened, 'reused': reused, 'reuse_ratio': round(reused / sent, 3) if sent else 0.0}
+
+    @staticmethod
+    def _release_on_close(response, controller, *outcome):
+        close = response.close
+        released = []
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if not released:
+                    released.append(True)
+                    controller.release(*outcome)
+        response.close = close_and_release
+
+
+class RateLimitedSession:
+    """aiohttp.ClientSession wrapper whose get() and head() are paced by a RateLimiter.
+
+    ``async with limited.get(url) as response`` behaves like the plain session,
+    retrying 429/503 responses after the host backs off.
+    """
+
+    def __init__(self, session, limiter, throttle_retries=3):
+        self.session = session
+        self.limiter = limiter
+        self.throttle_retries = throttle_retries
+
+    def get(self, url, **kwargs):
+        return _LimitedRequest(self, 'GET', url, kwargs)
+
+    def head(self, url, **kwargs):
+        return _LimitedRequest(self, 'HEAD', url, kwargs)
+
+
+class _LimitedRequest:
+
+    def __init__(self, owner, method, url, kwargs):
+        self.owner, self.method, self.url, self.kwargs = owner, method, url, kwargs
+        self.controller = owner.limiter.controller(url)
+        self.response = None
+        self.outcome = ()
+
+    async def __aenter__(self):
+        for attempt in range(self.owner.throttle_retries + 1):
+            await self.controller.acquire_async()
+            started = time.monotonic()
+            try:
+                response = await self.owner.session.request(self.method, self.url, **self.kwargs)
+            except BaseException:
+                self.controller.release()
+                raise
+            outcome = (response.status, time.monotonic() - started,
+                       parse_retry_after(response.headers.get('Retry-After')))
+            if response.status in THROTTLE_STATUSES and attempt < self.owner.throttle_retries:
+                self.controller.release(*outcome)
+                response.release()
+                continue
+            self.response, self.outcome = response, outcome
+            return response
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.response.release()
+        # Released only now so the slot covers the whole transfer. A transfer that died
+        # part way counts as a connection error; errors raised by the caller do not.
+        status, latency, retry_after = self.outcome
+        if isinstance(exc, TRANSFER_ERRORS):
+            status = None
+        self.controller.release(status, latency, retry_after)
@@ -0,0 +1,84 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+STATE_FILENAME = '.scrape_state.json'
+
+
+def page_hash(html):
+    return hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+
+def paper_hash(abstract_href):
+    """The paper hash NeurIPS embeds in '<hash>-Abstract[-Track].html' links."""
+    return abstract_href.rsplit('/', 1)[-1].split('-Abstract', 1)[0]
+
+
+class ScrapeState:
+    """Per-year record of what the last scrape saw, for incremental runs.
+
+    For every year it keeps the index page hash, the paper count, the hashes
+    of the papers that are done, those listed but not done yet, and when the
+    year was last scraped. What "done" means is up to the caller: downloaded
+    for Scrapper.py, stored for the engine. A year whose index page hash is
+    unchanged and has nothing pending can be skipped outright; for any other
+    year only papers that are not done need to be processed.
+    """
+
+    def __init__(self, path=STATE_FILENAME):
+        self.path = path
+        self.years = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.years = json.load(f)
+
+    def _done(self, year):
+        entry = self.years.get(str(year))
+        # Entries written before 'pending' existed also listed papers whose download failed.
+        return set(entry['paper_hashes']) if entry and 'pending' in entry else set()
+
+    def page_changed(self, year, html):
+        """True unless the index is the one last seen and every paper on it is done."""
+        entry = self.years.get(str(year))
+        return (entry is None or entry['page_hash'] != page_hash(html)
+                or entry.get('pending', True) != [])
+
+    def new_paper_hashes(self, year, hashes):
+        done = self._done(year)
+        return [h for h in hashes if h not in done]
+
+    def update(self, year, html, hashes):
+        """Records the index as seen; its papers stay pending until mark_done."""
+        with self._lock:
+            done = self._done(year)
+            self.years[str(year)] = {
+                'page_hash': page_hash(html),
+                'paper_count': len(hashes),
+                'paper_hashes': sorted(done),
+                'pending': sorted(set(hashes) - done),
+                'last_scrape': time.time(),
+            }
+
+    def mark_done(self, year, hashes):
+        with self._lock:
+            entry = self.years.get(str(year))
+            if entry is None:
+                return
+            hashes = set(hashes)
+            entry['paper_hashes'] = sorted(hashes.union(entry['paper_hashes']))
+            entry['pending'] = sorted(set(entry.get('pending', ())) - hashes)
+
+    def forget(self, year):
+        """Drops what is known about a year, so its next scrape processes every paper."""
+        with self._lock:
+            self.years.pop(str(year), None)
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.years, f)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,309 @@
+"""Full-text BM25 search over the downloaded PDFs.
+
+Text is extracted and tokenized in worker processes (PyMuPDF when installed,
+otherwise pypdf) and stored as an inverted index in SQLite next to the PDFs.
+Postings are written in segments, one row per term and batch of documents
+holding packed document ids and term frequencies, so a batch costs one insert
+per distinct term rather than one per (term, document) and a query reads a
+handful of blobs per term. Documents are keyed by the paper hash and year from
+the scrape records.
+
+Indexing is incremental and resumable: each document is committed as soon as
+it is extracted, files whose size and mtime are unchanged are skipped without
+being opened, and files that were touched but not modified are recognised by
+their SHA-256 and not extracted again.
+"""
+import os
+import re
+import math
+import sqlite3
+import threading
+import importlib.util
+import concurrent.futures
+from array import array
+from heapq import nlargest
+from collections import Counter
+
+from download_manifest import hash_file
+
+INDEX_FILENAME = '.search_index.sqlite'
+# Fastest first.
+DEFAULT_ORDER = ('pymupdf', 'pypdf')
+K1 = 1.2
+B = 0.75
+COMMIT_EVERY = 500          # Documents per postings segment and transaction while indexing
+MAX_SEGMENTS = 32           # More segments than this are merged at the end of an update
+
+_TOKEN_RE = re.compile(r'[a-z][a-z0-9]+')
+STOPWORDS = frozenset("""
+    an and are as at be by for from has have in is it its of on or that the this to was we were which with
+    our can not but also these than their then there they been such into more using use used each may
+""".split())
+
+
+def tokenize(text):
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+# The PDF libraries are imported on first use: they are slow to import and only
+# the extraction workers need them.
+def pymupdf_text(path):
+    import pymupdf
+    with pymupdf.open(path) as document:
+        return ''.join(page.get_text() for page in document)
+
+
+def pypdf_text(path):
+    import pypdf
+    return ''.join(page.extract_text() or '' for page in pypdf.PdfReader(path).pages)
+
+
+EXTRACTORS = {name: extractor for name, extractor in (('pymupdf', pymupdf_text), ('pypdf', pypdf_text))
+              if importlib.util.find_spec(name) is not None}
+
+
+def get_extractor(name=None):
+    """Returns the named text extractor, or the fastest installed one when name is None."""
+    if name is None:
+        name = next((n for n in DEFAULT_ORDER if n in EXTRACTORS), None)
+        if name is None:
+            raise ValueError("PDF text extraction needs pymupdf or pypdf, neither is installed")
+    try:
+        return EXTRACTORS[name]
+    except KeyError:
+        raise ValueError(f"Unknown or unavailable PDF extractor {name!r}; "
+                         f"available: {', '.join(sorted(EXTRACTORS))}") from None
+
+
+def analyze_pdf(path, known_sha256=None, extractor=None):
+    """Term counts for one PDF; runs in the indexing worker processes.
+
+    Returns ``(sha256, term_counts, length, error)``; term_counts is None when
+    the content hash matches known_sha256, i.e. the file was only touched.
+    """
+    sha256 = hash_file(path).hexdigest()
+    if sha256 == known_sha256:
+        return sha256, None, 0, None
+    try:
+        tokens = tokenize(get_extractor(extractor)(path))
+    except Exception as e:
+        return sha256, {}, 0, f"{type(e).__name__}: {e}"
+    return sha256, dict(Counter(tokens)), len(tokens), None
+
+
+class SearchIndex:
+    """On-disk BM25 index.
+
+    Replacing or removing a document only deletes its ``documents`` row; its
+    old postings are skipped at query time and dropped when segments merge.
+    """
+
+    def __init__(self, path=INDEX_FILENAME):
+        self.path = path
+        self.terms = None
+        self.live = None
+        self.pending = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                hash TEXT NOT NULL UNIQUE,
+                year INTEGER,
+                title TEXT,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                sha256 TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                error TEXT
+            );
+            CREATE TABLE IF NOT EXISTS terms (
+                term_id INTEGER PRIMARY KEY,
+                term TEXT NOT NULL UNIQUE
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term_id INTEGER NOT NULL,
+                segment INTEGER NOT NULL,
+                doc_ids BLOB NOT NULL,
+                tfs BLOB NOT NULL,
+                PRIMARY KEY (term_id, segment)
+            ) WITHOUT ROWID;
+        """)
+        self._db.commit()
+        self.segment = (self._db.execute("SELECT MAX(segment) FROM postings").fetchone()[0] or 0) + 1
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def _term_ids(self, terms):
+        if self.terms is None:
+            self.terms = dict(self._db.execute("SELECT term, term_id FROM terms"))
+        new_terms = [term for term in terms if term not in self.terms]
+        if new_terms:
+            next_id = (self._db.execute("SELECT MAX(term_id) FROM terms").fetchone()[0] or 0) + 1
+            new_ids = range(next_id, next_id + len(new_terms))
+            self._db.executemany("INSERT INTO terms (term_id, term) VALUES (?, ?)", zip(new_ids, new_terms))
+            self.terms.update(zip(new_terms, new_ids))
+        return [self.terms[term] for term in terms]
+
+    def add(self, paper_hash, year, title, path, size, mtime, sha256, term_counts, length, error=None):
+        """Replaces the document for paper_hash; it becomes searchable at the next commit()."""
+        with self._lock:
+            self._db.execute("DELETE FROM documents WHERE hash = ?", (paper_hash,))
+            doc_id = self._db.execute(
+                "INSERT INTO documents (hash, year, title, path, size, mtime, sha256, length, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (paper_hash, year, title, path, size, mtime, sha256, length, error)).lastrowid
+            for term_id, tf in zip(self._term_ids(list(term_counts)), term_counts.values()):
+                postings = self.pending.get(term_id)
+                if postings is None:
+                    postings = self.pending[term_id] = (array('I'), array('I'))
+                postings[0].append(doc_id)
+                postings[1].append(tf)
+            self.live = None
+
+    def remove(self, paper_hash):
+        with self._lock:
+            self._db.execute("DELETE FROM documents WHERE hash = ?", (paper_hash,))
+            self.live = None
+
+    def commit(self):
+        """Writes the pending postings as one segment, in the same transaction as their documents."""
+        with self._lock:
+            if self.pending:
+                self._db.executemany(
+                    "INSERT INTO postings (term_id, segment, doc_ids, tfs) VALUES (?, ?, ?, ?)",
+                    ((term_id, self.segment, doc_ids.tobytes(), tfs.tobytes())
+                     for term_id, (doc_ids, tfs) in sorted(self.pending.items())))
+                self.pending = {}
+                self.segment += 1
+            self._db.commit()
+
+    def merge_segments(self):
+        """Rewrites all postings as a single segment, dropping those of removed documents."""
+        with self._lock:
+            live = {doc_id for doc_id, in self._db.execute("SELECT doc_id FROM documents")}
+            merged = []
+            current, doc_ids, tfs = None, array('I'), array('I')
+            for term_id, blob_ids, blob_tfs in self._db.execute(
+                    "SELECT term_id, doc_ids, tfs FROM postings ORDER BY term_id, segment"):
+                if term_id != current:
+                    if doc_ids:
+                        merged.append((current, doc_ids.tobytes(), tfs.tobytes()))
+                    current, doc_ids, tfs = term_id, array('I'), array('I')
+                segment_ids, segment_tfs = array('I'), array('I')
+                segment_ids.frombytes(blob_ids)
+                segment_tfs.frombytes(blob_tfs)
+                for doc_id, tf in zip(segment_ids, segment_tfs):
+                    if doc_id in live:
+                        doc_ids.append(doc_id)
+                        tfs.append(tf)
+            if doc_ids:
+                merged.append((current, doc_ids.tobytes(), tfs.tobytes()))
+            self._db.execute("DELETE FROM postings")
+            self._db.executemany("INSERT INTO postings (term_id, segment, doc_ids, tfs) VALUES (?, 1, ?, ?)", merged)
+            self._db.commit()
+            self.segment = 2
+
+    def update(self, documents, processes=None, extractor=None, on_progress=None):
+        """Brings the index in line with documents, a list of (paper_hash, year, title, path).
+
+        Documents whose file is gone, or which are no longer listed, are
+        dropped. Returns counts of indexed, unchanged, removed and failed
+        documents. on_progress(done, total) is called as extraction finishes.
+        """
+        with self._lock:
+            known = {row[0]: row[1:] for row in self._db.execute(
+                "SELECT hash, path, size, mtime, sha256 FROM documents")}
+        counts = {'indexed': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+        listed = set()
+        todo = []
+        for paper_hash, year, title, path in documents:
+            if not os.path.exists(path):
+                continue
+            listed.add(paper_hash)
+            stat = os.stat(path)
+            entry = known.get(paper_hash)
+            if entry and entry[0] == str(path) and entry[1] == stat.st_size and entry[2] == stat.st_mtime:
+                counts['unchanged'] += 1
+            else:
+                todo.append((paper_hash, year, title, str(path), stat, entry[3] if entry else None))
+
+        for paper_hash in known.keys() - listed:
+            self.remove(paper_hash)
+            counts['removed'] += 1
+        self.commit()
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = {executor.submit(analyze_pdf, job[3], job[5], extractor): job for job in todo}
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                paper_hash, year, title, path, stat, known_sha256 = futures[future]
+                sha256, term_counts, length, error = future.result()
+                if term_counts is None:
+                    # Same bytes as before, only the mtime moved; remember the new stat.
+                    with self._lock:
+                        self._db.execute("UPDATE documents SET path = ?, size = ?, mtime = ? WHERE hash = ?",
+                                         (path, stat.st_size, stat.st_mtime, paper_hash))
+                    counts['unchanged'] += 1
+                else:
+                    self.add(paper_hash, year, title, path, stat.st_size, stat.st_mtime, sha256,
+                             term_counts, length, error)
+                    counts['failed' if error else 'indexed'] += 1
+                if done % COMMIT_EVERY == 0:
+                    self.commit()
+                if on_progress is not None:
+                    on_progress(done, len(todo))
+        self.commit()
+        if self.segment - 1 > MAX_SEGMENTS or counts['removed']:
+            self.merge_segments()
+        return counts
+
+    def _live_documents(self):
+        if self.live is None:
+            self.live = {doc_id: (length, year) for doc_id, length, year in
+                         self._db.execute("SELECT doc_id, length, year FROM documents WHERE length > 0")}
+        return self.live
+
+    def search(self, query, limit=10, start_year=None, end_year=None):
+        """BM25-ranked documents for query as (score, hash, year, title, path) tuples."""
+        terms = sorted(set(tokenize(query)))
+        with self._lock:
+            live = self._live_documents()
+            if not terms or not live:
+                return []
+            average_length = sum(length for length, _ in live.values()) / len(live)
+            low = start_year if start_year is not None else -1
+            high = end_year if end_year is not None else 9999
+            # Length normalisation per candidate document; anything not in here is not scored.
+            norms = {doc_id: K1 * (1 - B + B * length / average_length)
+                     for doc_id, (length, year) in live.items()
+                     if (start_year is None and end_year is None) or (year is not None and low <= year <= high)}
+            placeholders = ','.join('?' * len(terms))
+            scores = {}
+            for term_id, in self._db.execute(f"SELECT term_id FROM terms WHERE term IN ({placeholders})", terms):
+                doc_ids, tfs = array('I'), array('I')
+                for blob_ids, blob_tfs in self._db.execute(
+                        "SELECT doc_ids, tfs FROM postings WHERE term_id = ?", (term_id,)):
+                    doc_ids.frombytes(blob_ids)
+                    tfs.frombytes(blob_tfs)
+                # Like Lucene, postings of replaced documents count towards df until segments merge.
+                df = len(doc_ids)
+                idf_k1 = math.log(1 + (len(live) - df + 0.5) / (df + 0.5)) * (K1 + 1)
+                get_norm, get_score = norms.get, scores.get
+                for doc_id, tf in zip(doc_ids, tfs):
+                    norm = get_norm(doc_id)
+                    if norm is not None:
+                        scores[doc_id] = get_score(doc_id, 0.0) + idf_k1 * tf / (tf + norm)
+            best = nlargest(limit, scores.items(), key=lambda item: item[1])
+            results = []
+            for doc_id, score in best:
+                results.append((score,) + self._db.execute(
+                    "SELECT hash, year, title, path FROM documents WHERE doc_id = ?", (doc_id,)).fetchone())
+        return results
@@ -0,0 +1,348 @@
+"""Leased work queue shared by a crawl coordinator and its workers.
+
+Tasks are claimed under a lease that the worker extends with heartbeats. A
+lease is just the time the task becomes claimable again: a worker that dies
+or stalls stops heartbeating, its lease runs out and the next ``claim`` hands
+the task to someone else. A task that keeps failing (or keeps losing its
+lease) is given up after ``max_attempts``. Finished tasks carry a result and
+a sequence number, so the coordinator can merge results incrementally and a
+restarted coordinator can merge them again from zero.
+
+Backends, chosen by ``open_queue``:
+
+* SQLite file - every node opens the same file, e.g. on the coordinator's
+  disk for local workers or on a shared volume that supports locking.
+* ``redis://host:port/db`` - needs the redis package; all state lives in
+  Redis and every transition is a Lua script, so it is atomic across nodes.
+* ``memory:`` - an in-process SQLite queue for tests and single-box runs.
+
+Lease times come from each node's clock, so nodes should run NTP; leases
+are minutes long, which makes ordinary skew harmless.
+"""
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import importlib.util
+from dataclasses import dataclass
+
+HAVE_REDIS = importlib.util.find_spec('redis') is not None
+QUEUE_FILENAME = 'crawl_queue.sqlite'
+MAX_ATTEMPTS = 3
+
+
+@dataclass(slots=True)
+class Lease:
+    task_id: str
+    kind: str
+    payload: dict
+    attempts: int
+
+
+def shard_of(paper_hash, shards):
+    """Stable shard in [0, shards) for a paper hash.
+
+    The hash is hashed again because proceedings hashes are not uniformly
+    spread (older years share long prefixes), so ranges of it are not even.
+    """
+    return int(hashlib.sha1(paper_hash.encode()).hexdigest()[:8], 16) * shards >> 32
+
+
+class WorkQueue:
+    """Interface shared by the queue backends.
+
+    ``add`` is idempotent (an existing task id is left alone), ``claim``
+    returns a ``Lease`` or None, and ``heartbeat``/``complete`` return False
+    once the caller no longer holds the task.
+    """
+
+    def add(self, task_id, kind, payload):
+        raise NotImplementedError
+
+    def claim(self, owner, lease_seconds, max_attempts=MAX_ATTEMPTS):
+        raise NotImplementedError
+
+    def heartbeat(self, task_id, owner, lease_seconds):
+        raise NotImplementedError
+
+    def complete(self, task_id, owner, result):
+        raise NotImplementedError
+
+    def fail(self, task_id, owner, error, retry_delay=0.0, max_attempts=MAX_ATTEMPTS):
+        raise NotImplementedError
+
+    def results(self, after=0):
+        """(task_id, kind, payload, result, seq) for tasks finished after seq, in order."""
+        raise NotImplementedError
+
+    def counts(self):
+        """{(kind, state): count} with state one of pending, leased, done, failed."""
+        raise NotImplementedError
+
+    def failed(self):
+        """(task_id, error) for tasks that were given up."""
+        raise NotImplementedError
+
+    def set_meta(self, key, value):
+        raise NotImplementedError
+
+    def get_meta(self, key):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteWorkQueue(WorkQueue):
+
+    def __init__(self, path=QUEUE_FILENAME):
+        self.path = path
+        self._lock = threading.Lock()
+        # Autocommit, with explicit BEGIN IMMEDIATE where a read decides a write,
+        # so two processes can never claim the same task.
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        if path != ':memory:':
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                available_at REAL NOT NULL DEFAULT 0,
+                owner TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                done_seq INTEGER
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS tasks_due ON tasks (state, available_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS tasks_done ON tasks (done_seq) WHERE done_seq IS NOT NULL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def add(self, task_id, kind, payload):
+        with self._lock:
+            cursor = self._db.execute("INSERT OR IGNORE INTO tasks (task_id, kind, payload) VALUES (?, ?, ?)",
+                                      (task_id, kind, json.dumps(payload)))
+            return cursor.rowcount == 1
+
+    def claim(self, owner, lease_seconds, max_attempts=MAX_ATTEMPTS):
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = self._db.execute(
+                        "SELECT task_id, kind, payload, attempts FROM tasks "
+                        "WHERE state IN ('pending', 'leased') AND available_at <= ? "
+                        "ORDER BY available_at, rowid LIMIT 1", (now,)).fetchone()
+                    if row is None:
+                        return None
+                    task_id, kind, payload, attempts = row
+                    if attempts >= max_attempts:
+                        # Its last holder lost the lease without reporting back.
+                        self._db.execute("UPDATE tasks SET state = 'failed', owner = NULL, "
+                                         "error = COALESCE(error, 'lease expired') WHERE task_id = ?", (task_id,))
+                        continue
+                    self._db.execute("UPDATE tasks SET state = 'leased', owner = ?, available_at = ?, "
+                                     "attempts = attempts + 1 WHERE task_id = ?",
+                                     (owner, now + lease_seconds, task_id))
+                    return Lease(task_id, kind, json.loads(payload), attempts + 1)
+            finally:
+                self._db.execute("COMMIT")
+
+    def heartbeat(self, task_id, owner, lease_seconds):
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE tasks SET available_at = ? WHERE task_id = ? AND owner = ? AND state = 'leased'",
+                (time.time() + lease_seconds, task_id, owner))
+            return cursor.rowcount == 1
+
+    def complete(self, task_id, owner, result):
+        # A result is accepted from whoever finishes first, even after the lease
+        # moved on; tasks are idempotent, so a late duplicate is simply dropped.
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE tasks SET state = 'done', owner = ?, result = ?, error = NULL, "
+                "done_seq = (SELECT COALESCE(MAX(done_seq), 0) + 1 FROM tasks) "
+                "WHERE task_id = ? AND state IN ('pending', 'leased')",
+                (owner, json.dumps(result), task_id))
+            return cursor.rowcount == 1
+
+    def fail(self, task_id, owner, error, retry_delay=0.0, max_attempts=MAX_ATTEMPTS):
+        with self._lock:
+            self._db.execute(
+                "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "owner = NULL, available_at = ?, error = ? WHERE task_id = ? AND owner = ? AND state = 'leased'",
+                (max_attempts, time.time() + retry_delay, error, task_id, owner))
+
+    def results(self, after=0):
+        with self._lock:
+            rows = self._db.execute("SELECT task_id, kind, payload, result, done_seq FROM tasks "
+                                    "WHERE done_seq > ? ORDER BY done_seq", (after,)).fetchall()
+        return [(task_id, kind, json.loads(payload), json.loads(result), seq)
+                for task_id, kind, payload, result, seq in rows]
+
+    def counts(self):
+        with self._lock:
+            rows = self._db.execute("SELECT kind, state, COUNT(*) FROM tasks GROUP BY kind, state").fetchall()
+        return {(kind, state): count for kind, state, count in rows}
+
+    def failed(self):
+        with self._lock:
+            return self._db.execute("SELECT task_id, error FROM tasks WHERE state = 'failed' "
+                                    "ORDER BY task_id").fetchall()
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row and row[0]
+
+
+class RedisWorkQueue(WorkQueue):
+    """The same state machine in Redis.
+
+    ``{prefix}due`` is a sorted set of claimable-or-leased task ids scored by
+    the time they become claimable, mirroring SQLite's available_at; each
+    task is a hash at ``{prefix}task:<id>``. Scripts touch task keys they
+    derive themselves, so this targets a single Redis server, not a cluster.
+    """
+
+    _ADD = """
+        local key = ARGV[3] .. 'task:' .. ARGV[1]
+        if redis.call('EXISTS', key) == 1 then return 0 end
+        redis.call('HSET', key, 'kind', ARGV[2], 'payload', ARGV[4], 'state', 'pending', 'attempts', 0)
+        redis.call('ZADD', ARGV[3] .. 'due', 0, ARGV[1])
+        redis.call('SADD', ARGV[3] .. 'tasks', ARGV[1])
+        return 1"""
+    _CLAIM = """
+        local now, lease, max_attempts = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[4])
+        while true do
+            local ids = redis.call('ZRANGEBYSCORE', ARGV[5] .. 'due', '-inf', now, 'LIMIT', 0, 1)
+            if #ids == 0 then return false end
+            local id = ids[1]
+            local key = ARGV[5] .. 'task:' .. id
+            local attempts = tonumber(redis.call('HGET', key, 'attempts') or '0')
+            if attempts >= max_attempts then
+                redis.call('ZREM', ARGV[5] .. 'due', id)
+                redis.call('HSET', key, 'state', 'failed')
+                redis.call('HSETNX', key, 'error', 'lease expired')
+            else
+                redis.call('ZADD', ARGV[5] .. 'due', now + lease, id)
+                redis.call('HSET', key, 'state', 'leased', 'owner', ARGV[3], 'attempts', attempts + 1)
+                return {id, redis.call('HGET', key, 'kind'), redis.call('HGET', key, 'payload'), attempts + 1}
+            end
+        end"""
+    _HEARTBEAT = """
+        local key = ARGV[4] .. 'task:' .. ARGV[1]
+        if redis.call('HGET', key, 'state') ~= 'leased' or redis.call('HGET', key, 'owner') ~= ARGV[2] then
+            return 0
+        end
+        redis.call('ZADD', ARGV[4] .. 'due', ARGV[3], ARGV[1])
+        return 1"""
+    _COMPLETE = """
+        local key = ARGV[4] .. 'task:' .. ARGV[1]
+        local state = redis.call('HGET', key, 'state')
+        if state ~= 'pending' and state ~= 'leased' then return 0 end
+        local seq = redis.call('INCR', ARGV[4] .. 'seq')
+        redis.call('HSET', key, 'state', 'done', 'owner', ARGV[2], 'result', ARGV[3], 'done_seq', seq)
+        redis.call('HDEL', key, 'error')
+        redis.call('ZREM', ARGV[4] .. 'due', ARGV[1])
+        redis.call('ZADD', ARGV[4] .. 'done', seq, ARGV[1])
+        return 1"""
+    _FAIL = """
+        local key = ARGV[6] .. 'task:' .. ARGV[1]
+        if redis.call('HGET', key, 'state') ~= 'leased' or redis.call('HGET', key, 'owner') ~= ARGV[2] then
+            return 0
+        end
+        redis.call('HDEL', key, 'owner')
+        redis.call('HSET', key, 'error', ARGV[3])
+        if tonumber(redis.call('HGET', key, 'attempts')) >= tonumber(ARGV[5]) then
+            redis.call('HSET', key, 'state', 'failed')
+            redis.call('ZREM', ARGV[6] .. 'due', ARGV[1])
+        else
+            redis.call('HSET', key, 'state', 'pending')
+            redis.call('ZADD', ARGV[6] .. 'due', ARGV[4], ARGV[1])
+        end
+        return 1"""
+
+    def __init__(self, url, prefix='neurips:'):
+        import redis
+        self.path = url
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._scripts = {name: self._redis.register_script(getattr(self, f"_{name.upper()}"))
+                         for name in ('add', 'claim', 'heartbeat', 'complete', 'fail')}
+
+    def close(self):
+        self._redis.close()
+
+    def add(self, task_id, kind, payload):
+        return self._scripts['add'](args=[task_id, kind, self.prefix, json.dumps(payload)]) == 1
+
+    def claim(self, owner, lease_seconds, max_attempts=MAX_ATTEMPTS):
+        row = self._scripts['claim'](args=[time.time(), lease_seconds, owner, max_attempts, self.prefix])
+        if not row:
+            return None
+        task_id, kind, payload, attempts = row
+        return Lease(task_id, kind, json.loads(payload), int(attempts))
+
+    def heartbeat(self, task_id, owner, lease_seconds):
+        return self._scripts['heartbeat'](args=[task_id, owner, time.time() + lease_seconds, self.prefix]) == 1
+
+    def complete(self, task_id, owner, result):
+        return self._scripts['complete'](args=[task_id, owner, json.dumps(result), self.prefix]) == 1
+
+    def fail(self, task_id, owner, error, retry_delay=0.0, max_attempts=MAX_ATTEMPTS):
+        self._scripts['fail'](args=[task_id, owner, error, time.time() + retry_delay, max_attempts, self.prefix])
+
+    def _tasks(self, task_ids, *fields):
+        pipe = self._redis.pipeline(transaction=False)
+        for task_id in task_ids:
+            pipe.hmget(f"{self.prefix}task:{task_id}", *fields)
+        return pipe.execute()
+
+    def results(self, after=0):
+        task_ids = self._redis.zrangebyscore(f"{self.prefix}done", f"({after}", '+inf')
+        return [(task_id, kind, json.loads(payload), json.loads(result), int(seq))
+                for task_id, (kind, payload, result, seq)
+                in zip(task_ids, self._tasks(task_ids, 'kind', 'payload', 'result', 'done_seq'))]
+
+    def counts(self):
+        task_ids = sorted(self._redis.smembers(f"{self.prefix}tasks"))
+        counts = {}
+        for kind, state in self._tasks(task_ids, 'kind', 'state'):
+            counts[(kind, state)] = counts.get((kind, state), 0) + 1
+        return counts
+
+    def failed(self):
+        task_ids = sorted(self._redis.smembers(f"{self.prefix}tasks"))
+        return [(task_id, error) for task_id, (state, error) in zip(task_ids, self._tasks(task_ids, 'state', 'error'))
+                if state == 'failed']
+
+    def set_meta(self, key, value):
+        self._redis.hset(f"{self.prefix}meta", key, value)
+
+    def get_meta(self, key):
+        return self._redis.hget(f"{self.prefix}meta", key)
+
+
+def open_queue(url=QUEUE_FILENAME):
+    """Opens a queue: 'redis://...', 'memory:' or a SQLite path (optionally 'sqlite:///path')."""
+    url = str(url)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        if not HAVE_REDIS:
+            raise ValueError(f"Work queue {url!r} needs the redis package, which is not installed")
+        return RedisWorkQueue(url)
+    if url == 'memory:':
+        return SQLiteWorkQueue(':memory:')
+    return SQLiteWorkQueue(url[len('sqlite:///'):] if url.startswith('sqlite:///') else url)